@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "family_budget.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -61,11 +62,61 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "family_budget.pagination.TotalsPageNumberPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_RENDERER_CLASSES": (
+        "family_budget.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "family_budget.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.coreapi.AutoSchema",
 }
 
+# Maximum `page_size` that clients can request from the cursor paginated lists
+CURSOR_PAGINATION_MAX_PAGE_SIZE = env.int("CURSOR_PAGINATION_MAX_PAGE_SIZE", default=1000)
+
+# Number of incomes/expenses inserted per statement when they are created in bulk
+BULK_CREATE_BATCH_SIZE = env.int("BULK_CREATE_BATCH_SIZE", default=500)
+
+# Number of rows fetched from the database and streamed at once by budget exports
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)
+
+# Number of valid rows loaded at once by transaction imports and the number of rejected rows
+# listed in import responses
+IMPORT_CHUNK_SIZE = env.int("IMPORT_CHUNK_SIZE", default=5000)
+IMPORT_MAX_REPORTED_REJECTIONS = env.int("IMPORT_MAX_REPORTED_REJECTIONS", default=100)
+
+# Maximum number of changes returned by a call of the sync feed
+SYNC_BATCH_SIZE = env.int("SYNC_BATCH_SIZE", default=500)
+
+# Report the queries and timings of every request in `Server-Timing` headers and logs, flagging
+# requests running more queries than the budget, see `family_budget.metrics`
+REQUEST_METRICS = env.bool("REQUEST_METRICS", default=False)
+REQUEST_METRICS_QUERY_BUDGET = env.int("REQUEST_METRICS_QUERY_BUDGET", default=None)
+
+# Compress responses for clients accepting gzip, which mostly pays off for large lists. Leave it
+# disabled when responses are compressed by a proxy, and see the BREACH warning of Django's
+# `GZipMiddleware` documentation
+GZIP_RESPONSES = env.bool("GZIP_RESPONSES", default=False)
+if GZIP_RESPONSES:
+    # After the request metrics, so they include the compression
+    MIDDLEWARE.insert(1, "django.middleware.gzip.GZipMiddleware")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "family_budget.metrics": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
 ROOT_URLCONF = "exercise.urls"
 
 TEMPLATES = [
@@ -101,10 +152,34 @@ DATABASES = {
         "PASSWORD": env("POSTGRES_PASSWORD", default="postgres"),
         "HOST": env("POSTGRES_HOST", default="db"),
         "PORT": env("POSTGRES_PORT", default=5432),
+        # Seconds a connection is reused by the following requests of the same worker thread
+        # before being closed, 0 opens a new connection for every request
+        "CONN_MAX_AGE": env.int("POSTGRES_CONN_MAX_AGE", default=60),
+        # Check a reused connection is still usable at the beginning of each request
+        "CONN_HEALTH_CHECKS": env.bool("POSTGRES_CONN_HEALTH_CHECKS", default=True),
+        # Required when connecting through a pooler in transaction mode, e.g. PgBouncer
+        "DISABLE_SERVER_SIDE_CURSORS": env.bool(
+            "POSTGRES_DISABLE_SERVER_SIDE_CURSORS", default=False
+        ),
+        "OPTIONS": {
+            "connect_timeout": env.int("POSTGRES_CONNECT_TIMEOUT", default=5),
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+# Cache of serialized budgets, see `family_budget.cache`
+BUDGET_CACHE_ALIAS = "default"
+BUDGET_CACHE_TIMEOUT = env.int("BUDGET_CACHE_TIMEOUT", default=60 * 60)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -0,0 +1,75 @@
+from django.utils.functional import cached_property
+
+from .models import Budget
+
+
+class BudgetAccess:
+    """
+    Resolves which budgets a user has access to (owns or has been shared), caching the answers so
+    that each budget is checked at most once
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._checked = {}
+
+    @cached_property
+    def budget_ids(self):
+        """
+        Ids of all the budgets that the user has access to, fetched with a single query
+        """
+        return set(
+            Budget.objects.accessible_to(self.user).values_list("pk", flat=True)
+        )
+
+    def has_access(self, budget):
+        """
+        Check access to a budget given as an instance or an id. Unless all the accessible ids have
+        already been fetched, this is a single `EXISTS` query which never loads the shares.
+        """
+        if isinstance(budget, Budget):
+            if budget.owner_id == self.user.pk:
+                return True
+            budget = budget.pk
+        if "budget_ids" in self.__dict__:
+            return budget in self.budget_ids
+        if budget not in self._checked:
+            self._checked[budget] = (
+                Budget.objects.filter(pk=budget).accessible_to(self.user).exists()
+            )
+        return self._checked[budget]
+
+    async def ahas_access(self, budget):
+        """
+        Async version of `has_access`, using the async ORM
+        """
+        if isinstance(budget, Budget):
+            if budget.owner_id == self.user.pk:
+                return True
+            budget = budget.pk
+        if "budget_ids" in self.__dict__:
+            return budget in self.budget_ids
+        if budget not in self._checked:
+            self._checked[budget] = (
+                await Budget.objects.filter(pk=budget)
+                .accessible_to(self.user)
+                .aexists()
+            )
+        return self._checked[budget]
+
+    def accessible(self, budget_ids):
+        """
+        Return the subset of the given budget ids that the user has access to
+        """
+        return set(budget_ids) & self.budget_ids
+
+
+def get_budget_access(request):
+    """
+    Return the budget access resolver of the request, created on first use
+    """
+    access = getattr(request, "_budget_access", None)
+    if access is None or access.user != request.user:
+        access = BudgetAccess(request.user)
+        request._budget_access = access
+    return access
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FamilyBudgetConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "family_budget"
+
+    def ready(self):
+        # Connect the change log signal receivers
+        from . import changes  # noqa: F401
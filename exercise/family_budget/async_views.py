@@ -0,0 +1,225 @@
+"""
+Async read only views of budgets, incomes and expenses, for deployments served by an ASGI server.
+They return the same representations as the plain list and retrieve endpoints of `views`, but
+query the database with the async ORM, so a worker is not tied up by a request while waiting on
+the database or on a slow client.
+They are a narrower feature than the endpoints of `views`: only the page number pagination, the
+filters and `?with_totals=` are supported, budgets are not cached and are always serialized with
+all their incomes and expenses, and there are no `ETag`s. The endpoints of `views` are faster for
+budgets, which they serve from the budget cache.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .filters import ExpenseFilter, IncomeFilter
+from .models import Budget, Expense, Income
+from .pagination import TotalsPageNumberPagination
+from .permissions import IsBudgetOwnerOrSharedWith, IsIncomeExpenseOwnerOrSharedWith
+from .renderers import FastJSONRenderer
+from .serializers import (
+    BudgetSerializer,
+    ExpenseSerializer,
+    IncomeSerializer,
+    TotalsSerializer,
+)
+from .views import BudgetAPIViewSet, ExpenseAPIViewSet, IncomeAPIViewSet
+
+
+async def _aprefetch_transactions(budgets):
+    """
+    Prefetch the incomes and expenses of the budgets for `BudgetSerializer`. The prefetching
+    queries are not available in the async ORM, they run in a thread.
+    """
+    await sync_to_async(prefetch_related_objects)(
+        list(budgets), *BudgetAPIViewSet.nested_prefetches
+    )
+
+
+class AsyncReadOnlyAPIView(View):
+    """
+    Base class of async `GET` endpoints authenticating like DRF views.
+    Subclasses implement `aget_data` returning the data to render.
+    """
+
+    http_method_names = ["get"]
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_class = None
+    serializer_class = None
+
+    async def get(self, request, *args, **kwargs):
+        self.request = Request(
+            request,
+            authenticators=[auth() for auth in self.authentication_classes],
+        )
+        try:
+            # Authenticators are synchronous, e.g. they read the session
+            user = await sync_to_async(getattr)(self.request, "user")
+            if not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            data = await self.aget_data(*args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+        return self.render(data)
+
+    async def aget_data(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def acheck_object_permission(self, obj):
+        if not await self.permission_class().ahas_object_permission(
+            self.request, self, obj
+        ):
+            raise exceptions.PermissionDenied()
+
+    def handle_exception(self, exc):
+        """
+        Render API exceptions the way DRF views do
+        """
+        status_code = exc.status_code
+        if isinstance(exc, exceptions.NotAuthenticated):
+            authenticator = self.request.authenticators[0]
+            if not authenticator.authenticate_header(self.request):
+                # Without a `WWW-Authenticate` header the request is forbidden
+                status_code = status.HTTP_403_FORBIDDEN
+
+        data = exc.detail
+        if not isinstance(data, (list, dict)):
+            data = {"detail": data}
+        return self.render(data, status_code)
+
+    def get_serializer(self, *args, **kwargs):
+        return self.serializer_class(*args, context={"request": self.request}, **kwargs)
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(
+            FastJSONRenderer().render(data),
+            content_type="application/json",
+            status=status_code,
+        )
+
+
+class AsyncListAPIView(AsyncReadOnlyAPIView):
+    """
+    Paginated list of the entries that the user has access to, see `ListAllowedMixin`
+    """
+
+    filterset_class = None
+    totals_aggregates = None
+
+    def allowed_queryset(self):
+        raise NotImplementedError
+
+    async def aprepare(self, objects):
+        """
+        Hook fetching what the serializer needs for the page objects
+        """
+
+    async def aget_data(self, *args, **kwargs):
+        queryset = self.allowed_queryset()
+        if self.filterset_class is not None:
+            filterset = self.filterset_class(
+                self.request.query_params, queryset=queryset, request=self.request
+            )
+            # Validating the filters may query the database, e.g. the budget
+            if not await sync_to_async(filterset.is_valid)():
+                raise exceptions.ValidationError(filterset.errors)
+            queryset = filterset.qs
+
+        paginator = TotalsPageNumberPagination()
+        with_totals = self.totals_aggregates and self.request.query_params.get(
+            "with_totals"
+        ) in ("1", "true")
+        if with_totals:
+            paginator.aggregates = self.totals_aggregates
+
+        page = await paginator.apaginate_queryset(queryset, self.request)
+        await self.aprepare(page)
+        data = paginator.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        ).data
+        if with_totals:
+            data["totals"] = TotalsSerializer(paginator.get_totals(queryset)).data
+        return data
+
+
+class AsyncRetrieveAPIView(AsyncReadOnlyAPIView):
+    queryset = None
+
+    async def aprepare(self, obj):
+        """
+        Hook fetching what the serializer needs for the object
+        """
+
+    async def aget_data(self, pk):
+        try:
+            obj = await self.queryset.aget(pk=pk)
+        except self.queryset.model.DoesNotExist:
+            raise exceptions.NotFound()
+        await self.acheck_object_permission(obj)
+        await self.aprepare(obj)
+        return self.get_serializer(obj).data
+
+
+class AsyncBudgetListAPIView(AsyncListAPIView):
+    serializer_class = BudgetSerializer
+
+    def allowed_queryset(self):
+        return (
+            Budget.objects.accessible_to(self.request.user)
+            .select_related("owner")
+            .order_by("pk")
+        )
+
+    async def aprepare(self, objects):
+        await _aprefetch_transactions(objects)
+
+
+class AsyncBudgetRetrieveAPIView(AsyncRetrieveAPIView):
+    queryset = Budget.objects.select_related("owner")
+    serializer_class = BudgetSerializer
+    permission_class = IsBudgetOwnerOrSharedWith
+
+    async def aprepare(self, obj):
+        await _aprefetch_transactions([obj])
+
+
+class AsyncIncomeListAPIView(AsyncListAPIView):
+    serializer_class = IncomeSerializer
+    filterset_class = IncomeFilter
+    totals_aggregates = IncomeAPIViewSet.totals_aggregates
+
+    def allowed_queryset(self):
+        return (
+            Income.objects.accessible_to(self.request.user)
+            .select_related("budget")
+            .order_by("pk")
+        )
+
+
+class AsyncIncomeRetrieveAPIView(AsyncRetrieveAPIView):
+    queryset = Income.objects.select_related("budget")
+    serializer_class = IncomeSerializer
+    permission_class = IsIncomeExpenseOwnerOrSharedWith
+
+
+class AsyncExpenseListAPIView(AsyncListAPIView):
+    serializer_class = ExpenseSerializer
+    filterset_class = ExpenseFilter
+    totals_aggregates = ExpenseAPIViewSet.totals_aggregates
+
+    def allowed_queryset(self):
+        return (
+            Expense.objects.accessible_to(self.request.user)
+            .select_related("budget")
+            .order_by("pk")
+        )
+
+
+class AsyncExpenseRetrieveAPIView(AsyncRetrieveAPIView):
+    queryset = Expense.objects.select_related("budget")
+    serializer_class = ExpenseSerializer
+    permission_class = IsIncomeExpenseOwnerOrSharedWith
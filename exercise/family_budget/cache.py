@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.cache import caches
+
+
+class BudgetCache:
+    """
+    Read-through cache of serialized budgets.
+    Entries are keyed by the budget id and its `version`, stored in the database and bumped on
+    every write to the budget, its incomes, expenses or shares (see `changes`), so outdated
+    entries are never read and simply expire, whichever process wrote the budget. Payloads are
+    the same for every user having access to the budget, the access has to be checked before
+    reading from the cache.
+    """
+
+    prefix = "budget-cache"
+
+    @property
+    def cache(self):
+        return caches[settings.BUDGET_CACHE_ALIAS]
+
+    def keys(self, budgets, variant=""):
+        """
+        Return the cache keys of the current versions of the budgets, loaded with their
+        `version`, by budget id.
+        `variant` distinguishes payloads of the same budget version, e.g. rendered for other hosts.
+        """
+        return {
+            budget.pk: f"{self.prefix}:{budget.pk}:{budget.version}:{variant}"
+            for budget in budgets
+        }
+
+    def get_many(self, keys):
+        """
+        Return the cached payloads of the `keys` returned by `keys()`, by budget id
+        """
+        found = self.cache.get_many(keys.values())
+        self._count("hits", len(found))
+        self._count("misses", len(keys) - len(found))
+        return {
+            budget_id: found[key] for budget_id, key in keys.items() if key in found
+        }
+
+    def set_many(self, payloads):
+        """
+        Cache payloads given by their keys returned by `keys()`
+        """
+        self.cache.set_many(payloads, timeout=settings.BUDGET_CACHE_TIMEOUT)
+
+    def _count(self, counter, value):
+        if not value:
+            return
+        key = f"{self.prefix}:stats:{counter}"
+        self.cache.add(key, 0, timeout=None)
+        try:
+            self.cache.incr(key, value)
+        except ValueError:
+            pass
+
+    def stats(self):
+        counters = self.cache.get_many(
+            [f"{self.prefix}:stats:hits", f"{self.prefix}:stats:misses"]
+        )
+        hits = counters.get(f"{self.prefix}:stats:hits", 0)
+        misses = counters.get(f"{self.prefix}:stats:misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else None,
+        }
+
+
+budget_cache = BudgetCache()
+
@@ -0,0 +1,236 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Max, Min, Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .choices import ChangeActionChoices, ChangeTypeChoices
+from .models import Budget, BudgetChange, BudgetChangeSequence
+from .signals import transactions_changed
+
+
+def log_changes(entries, incremented=False):
+    """
+    Increment the version of the budgets, set their update time and log their changes under the
+    new versions. `entries` are `(type, object_id, action, user_id)` by budget id. The versions
+    are only read when they have already been `incremented` in the current transaction, e.g. by
+    `IncomeExpense.update_totals`.
+    """
+    with transaction.atomic(savepoint=False):
+        if not incremented:
+            # The UPDATE locks the budget rows, in a consistent order, until the changes are
+            # logged and committed, so the versions of a budget are committed in order
+            now = timezone.now()
+            for budget_id in sorted(entries):
+                Budget.objects.filter(pk=budget_id).update(
+                    version=F("version") + 1, updated_at=now
+                )
+        versions = dict(
+            Budget.objects.filter(pk__in=entries).values_list("pk", "version")
+        )
+        BudgetChange.objects.bulk_create(
+            BudgetChange(
+                budget_id=budget_id,
+                version=versions[budget_id],
+                type=change_type,
+                object_id=object_id,
+                action=action,
+                user_id=user_id,
+            )
+            for budget_id, budget_entries in entries.items()
+            if budget_id in versions
+            for change_type, object_id, action, user_id in budget_entries
+        )
+
+
+def compact_changes(budget_ids):
+    """
+    Delete the changes superseded by a later change of the same object, of the same budget and
+    for the same users, and the changes of deleted budgets meant for all their users. No client
+    misses anything: whatever its token, it gets the later change. Returns the number of deleted
+    changes.
+    """
+    existing = set(Budget.objects.filter(pk__in=budget_ids).values_list("pk", flat=True))
+    with transaction.atomic():
+        deleted, _ = BudgetChange.objects.filter(
+            budget_id__in=set(budget_ids) - existing, user=None
+        ).delete()
+        superseded = []
+        for budget_id in existing:
+            latest = set()
+            rows = (
+                BudgetChange.objects.filter(budget_id=budget_id)
+                .order_by("-version", "-pk")
+                .values_list("pk", "type", "object_id", "user_id")
+            )
+            for pk, *key in rows:
+                if tuple(key) in latest:
+                    superseded.append(pk)
+                latest.add(tuple(key))
+        deleted += BudgetChange.objects.filter(pk__in=superseded).delete()[0]
+    return deleted
+
+
+@receiver(post_save, sender=Budget)
+def log_budget_saved(sender, instance, **kwargs):
+    entry = (ChangeTypeChoices.BUDGET, instance.pk, ChangeActionChoices.UPSERT, None)
+    log_changes({instance.pk: [entry]})
+
+
+@receiver(pre_delete, sender=Budget)
+def collect_budget_users(sender, instance, **kwargs):
+    instance._change_log_users = [
+        instance.owner_id,
+        *instance.shared_with.values_list("pk", flat=True),
+    ]
+    instance._change_log_version = (
+        Budget.objects.filter(pk=instance.pk).values_list("version", flat=True).first()
+    )
+
+
+@receiver(post_delete, sender=Budget)
+def log_budget_deleted(sender, instance, **kwargs):
+    # The budget is gone, so the deletion is logged for every user who had access to it
+    BudgetChange.objects.bulk_create(
+        BudgetChange(
+            budget_id=instance.pk,
+            version=(instance._change_log_version or 0) + 1,
+            type=ChangeTypeChoices.BUDGET,
+            object_id=instance.pk,
+            action=ChangeActionChoices.DELETE,
+            user_id=user_id,
+        )
+        for user_id in instance._change_log_users
+    )
+
+
+@receiver(transactions_changed)
+def log_transactions_changed(sender, budget_ids, changes=None, **kwargs):
+    change_type = sender._meta.model_name
+    entries = defaultdict(list)
+    if changes is None:
+        for budget_id in budget_ids:
+            entries[budget_id].append((change_type, None, ChangeActionChoices.REFRESH, None))
+    else:
+        for action, pk, budget_id in changes:
+            entries[budget_id].append((change_type, pk, action, None))
+    # The versions have been incremented with the totals of the budgets
+    log_changes(entries, incremented=True)
+
+
+@receiver(m2m_changed, sender=Budget.shared_with.through)
+def log_shares_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # `pk_set` is not provided when clearing, keep what is cleared for `post_clear`
+        if reverse:
+            instance._cleared_shares = list(
+                instance.shared_budgets.values_list("pk", flat=True)
+            )
+        else:
+            instance._cleared_shares = list(
+                instance.shared_with.values_list("pk", flat=True)
+            )
+        return
+    if action == "post_clear":
+        action, pk_set = "post_remove", instance._cleared_shares
+    if action not in ("post_add", "post_remove"):
+        return
+
+    if reverse:
+        shares = [(budget_id, instance.pk) for budget_id in pk_set]
+    else:
+        shares = [(instance.pk, user_id) for user_id in pk_set]
+    entries = defaultdict(list)
+    for budget_id, user_id in shares:
+        if action == "post_remove":
+            entries[budget_id].append(
+                (ChangeTypeChoices.BUDGET, budget_id, ChangeActionChoices.DELETE, user_id)
+            )
+            continue
+        # Users having access see the budget changed, while the new user, who may have synced
+        # the budget before losing access to it, has to fetch all its incomes and expenses again
+        entries[budget_id] += [
+            (ChangeTypeChoices.BUDGET, budget_id, ChangeActionChoices.UPSERT, None),
+            (ChangeTypeChoices.INCOME, None, ChangeActionChoices.REFRESH, user_id),
+            (ChangeTypeChoices.EXPENSE, None, ChangeActionChoices.REFRESH, user_id),
+        ]
+    log_changes(entries)
+
+
+# Sequence numbers are stored in bigint columns
+MAX_SEQUENCE = 2**63 - 1
+
+
+def sequence_changes():
+    """
+    Number the committed changes which are not numbered yet, following the last number given.
+    Changes are numbered by one transaction at a time, holding the lock of the sequence row until
+    it commits, and a change is only numbered once committed, so the numbers are committed in
+    increasing order: a client which synced the changes up to a number never misses a change
+    numbered later, whichever transaction logged it first. Returns the last number given, all the
+    changes up to it are committed.
+    """
+    # The sequence row is not locked by every sync while there is nothing to number
+    if not BudgetChange.objects.filter(sequence=None).exists():
+        return BudgetChangeSequence.objects.values_list("last", flat=True).first() or 0
+    with transaction.atomic():
+        sequence, _ = BudgetChangeSequence.objects.select_for_update().get_or_create(pk=1)
+        pending = BudgetChange.objects.filter(sequence=None)
+        bounds = pending.aggregate(first=Min("pk"), last=Max("pk"))
+        if bounds["first"] is None:
+            return sequence.last
+        # Numbers follow the ids, with gaps, so they are given with a single UPDATE
+        offset = sequence.last + 1 - bounds["first"]
+        pending.filter(pk__lte=bounds["last"]).update(sequence=F("pk") + offset)
+        sequence.last = bounds["last"] + offset
+        sequence.save(update_fields=["last"])
+    return sequence.last
+
+
+def encode_since(sequence):
+    """
+    Encode the sequence number up to which a client synced into a token
+    """
+    return str(sequence)
+
+
+def decode_since(token):
+    """
+    Decode a token of `encode_since`, raising `ValueError` if it is invalid
+    """
+    if not (token.isascii() and token.isdigit()):
+        raise ValueError(f"Invalid sync token {token!r}")
+    sequence = int(token)
+    if sequence > MAX_SEQUENCE:
+        raise ValueError(f"Sync token {token!r} is out of range")
+    return sequence
+
+
+def changes_since(user, sequence, limit):
+    """
+    Return the changes numbered after `sequence` of the budgets that the user has access to, or
+    meant for the user, in order. Without a `sequence`, all the changes are returned except
+    deletions, which do not concern a client that has never synced.
+    At most `limit` changes are returned. Returns the changes, whether there are more, and the
+    sequence number to sync from next.
+    """
+    last = sequence_changes()
+    changes = BudgetChange.objects.filter(
+        Q(budget_id__in=Budget.objects.accessible_to(user).values("pk"), user=None)
+        | Q(user=user),
+        sequence__gt=sequence or 0,
+        sequence__lte=last,
+    ).order_by("sequence")
+    if sequence is None:
+        changes = changes.exclude(action=ChangeActionChoices.DELETE)
+
+    page = list(changes[: limit + 1])
+    has_more = len(page) > limit
+    if has_more:
+        page = page[:limit]
+        last = page[-1].sequence
+    # Unless there are more changes, the client syncs from the last number given next, past the
+    # changes of other budgets
+    return page, has_more, last
@@ -12,3 +12,16 @@ class CategoryChoices(models.TextChoices):
     INSURANCE = "INSURANCE", _("Insurance")
     WORK = "WORK", _("Work")
     OTHER = "OTHER", _("Other")
+
+
+class ChangeActionChoices(models.TextChoices):
+    UPSERT = "upsert", _("Created or updated")
+    DELETE = "delete", _("Deleted")
+    # Unknown changes of the budget incomes and expenses, e.g. after an import
+    REFRESH = "refresh", _("Refresh")
+
+
+class ChangeTypeChoices(models.TextChoices):
+    BUDGET = "budget", _("Budget")
+    INCOME = "income", _("Income")
+    EXPENSE = "expense", _("Expense")
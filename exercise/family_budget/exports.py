@@ -0,0 +1,54 @@
+import csv
+import json
+
+EXPORT_COLUMNS = ("type", "id", "amount", "category", "date")
+
+
+class _Echo:
+    """
+    File-like object returning what is written to it, so `csv.writer` can format single rows
+    """
+
+    def write(self, value):
+        return value
+
+
+def budget_transaction_rows(budget, chunk_size):
+    """
+    Yield `EXPORT_COLUMNS` tuples of all the incomes and expenses of the budget, reading them from
+    the database in chunks of `chunk_size` rows
+    """
+    for kind, transactions in (("income", budget.incomes), ("expense", budget.expenses)):
+        rows = (
+            transactions.order_by("pk")
+            .values_list("pk", "amount", "category", "date")
+            .iterator(chunk_size=chunk_size)
+        )
+        for pk, amount, category, date in rows:
+            yield kind, pk, str(amount), category, date.isoformat()
+
+
+def _chunked(lines, chunk_size):
+    """
+    Join lines into chunks of `chunk_size` lines so the response is not streamed row by row
+    """
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def csv_stream(rows, chunk_size):
+    writer = csv.writer(_Echo())
+    lines = (writer.writerow(row) for row in rows)
+    yield writer.writerow(EXPORT_COLUMNS)
+    yield from _chunked(lines, chunk_size)
+
+
+def ndjson_stream(rows, chunk_size):
+    lines = (json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+    yield from _chunked(lines, chunk_size)
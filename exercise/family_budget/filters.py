@@ -0,0 +1,39 @@
+from django_filters import rest_framework as filters
+
+from .models import BudgetPeriodTotal, Expense, Income
+
+
+class IncomeExpenseFilter(filters.FilterSet):
+    """
+    Abstract filter set for incomes and expenses. The date range is given with the `date_after`
+    and `date_before` query parameters, both inclusive.
+    """
+
+    date = filters.DateFromToRangeFilter()
+
+    class Meta:
+        abstract = True
+        fields = ("budget", "category", "date")
+
+
+class IncomeFilter(IncomeExpenseFilter):
+    class Meta(IncomeExpenseFilter.Meta):
+        model = Income
+
+
+class ExpenseFilter(IncomeExpenseFilter):
+    class Meta(IncomeExpenseFilter.Meta):
+        model = Expense
+
+
+class BudgetPeriodTotalFilter(filters.FilterSet):
+    """
+    Filter set for monthly totals. The months range is given with the `period_after` and
+    `period_before` query parameters, both inclusive.
+    """
+
+    period = filters.DateFromToRangeFilter()
+
+    class Meta:
+        model = BudgetPeriodTotal
+        fields = ("category", "period")
@@ -0,0 +1,128 @@
+import csv
+import io
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .choices import CategoryChoices
+from .models import Expense, Income, _shift
+
+IMPORT_MODELS = {"income": Income, "expense": Expense}
+REQUIRED_COLUMNS = ("type", "amount")
+
+
+class ImportReport:
+    """
+    Outcome of a transactions import. Only the first `max_reported` rejected rows are kept, the
+    other ones are only counted
+    """
+
+    def __init__(self, max_reported=None):
+        self.created = {kind: 0 for kind in IMPORT_MODELS}
+        self.rejected = []
+        self.rejected_count = 0
+        self.max_reported = max_reported
+
+    def reject(self, line, errors):
+        self.rejected_count += 1
+        if self.max_reported is None or len(self.rejected) < self.max_reported:
+            self.rejected.append({"line": line, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "rejected_count": self.rejected_count,
+            "rejected": self.rejected,
+        }
+
+
+def _clean_row(row, defaults):
+    """
+    Validate a CSV row against the income/expense model fields, using `defaults` for empty
+    columns. Returns the transaction type with the cleaned `amount`, `category` and `date`, and
+    the errors by column.
+    """
+    errors = {}
+    kind = (row.get("type") or "").strip().lower()
+    if kind not in IMPORT_MODELS:
+        errors["type"] = [f"Expected one of: {', '.join(IMPORT_MODELS)}."]
+    model = IMPORT_MODELS.get(kind, Income)
+
+    cleaned = {}
+    for name in ("amount", "category", "date"):
+        value = (row.get(name) or "").strip() or defaults.get(name)
+        try:
+            cleaned[name] = model._meta.get_field(name).clean(value, None)
+        except ValidationError as error:
+            errors[name] = error.messages
+    return kind, cleaned, errors
+
+
+def _copy_rows(model, budget, rows):
+    """
+    Load rows with PostgreSQL `COPY`, bypassing the ORM
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow((budget.pk, row["amount"], row["category"], row["date"]))
+    buffer.seek(0)
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} (budget_id, amount, category, date) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    deltas = {}
+    for row in rows:
+        _shift(deltas, {"budget": budget.pk, **row}, 1)
+    model.update_totals(deltas)
+
+
+def _load_rows(kind, budget, rows, report):
+    model = IMPORT_MODELS[kind]
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            _copy_rows(model, budget, rows)
+        else:
+            model.objects.bulk_create(model(budget=budget, **row) for row in rows)
+    report.created[kind] += len(rows)
+
+
+def import_transactions(budget, lines, chunk_size, report=None, on_reject=None):
+    """
+    Import incomes and expenses of the budget from CSV `lines` with `type`, `amount` and optional
+    `category` and `date` columns, e.g. files produced by the budget export.
+    The lines are consumed lazily and valid rows are loaded every `chunk_size` rows, so the whole
+    file is never held in memory. Invalid rows are skipped and reported, `on_reject` is called
+    with the line number and the errors of each of them.
+    """
+    report = report or ImportReport()
+    reader = csv.DictReader(lines)
+    columns = reader.fieldnames or []
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValidationError(f"Missing CSV columns: {', '.join(missing)}.")
+
+    defaults = {"category": CategoryChoices.OTHER, "date": timezone.localdate()}
+    pending = {kind: [] for kind in IMPORT_MODELS}
+    for row in reader:
+        kind, cleaned, errors = _clean_row(row, defaults)
+        if errors:
+            report.reject(reader.line_num, errors)
+            if on_reject is not None:
+                on_reject(reader.line_num, errors)
+            continue
+
+        pending[kind].append(cleaned)
+        if len(pending[kind]) >= chunk_size:
+            _load_rows(kind, budget, pending[kind], report)
+            pending[kind] = []
+
+    for kind, rows in pending.items():
+        if rows:
+            _load_rows(kind, budget, rows, report)
+    return report
@@ -0,0 +1,61 @@
+from django.db import connections
+from django.db.models import CharField, F, Q, Value
+
+# Sign of the amounts of each transaction type in the ledger
+LEDGER_SIGNS = {"income": 1, "expense": -1}
+LEDGER_ORDERING = ("date", "type", "id")
+LEDGER_COLUMNS = ("date", "type", "id", "budget", "amount", "category")
+
+
+def _after(kind, position):
+    """
+    Filter the transactions of type `kind` following the `(date, type, id)` position
+    """
+    date, position_kind, pk = position
+    if kind > position_kind:
+        return Q(date__gte=date)
+    if kind < position_kind:
+        return Q(date__gt=date)
+    return Q(date__gt=date) | Q(date=date, pk__gt=pk)
+
+
+def _ledger_rows(queryset, kind, after, limit):
+    if after is not None:
+        queryset = queryset.filter(_after(kind, after))
+    queryset = (
+        queryset.order_by()
+        .annotate(
+            type=Value(kind, output_field=CharField()),
+            signed_amount=F("amount") * LEDGER_SIGNS[kind],
+        )
+        .values_list("date", "type", "id", "budget", "signed_amount", "category")
+    )
+    if limit is not None:
+        # Read in the order of the `(budget, date, id)` index, from the position of the cursor
+        queryset = queryset.order_by("date", "id")[:limit]
+    return queryset
+
+
+def ledger(querysets, after=None, limit=None):
+    """
+    Merge the incomes and expenses querysets, given by transaction type, into a ledger ordered by
+    `(date, type, id)`, with negative amounts for expenses.
+    The ledger is read with a single `UNION ALL` query, starting after the `after` position and
+    limited to `limit` rows.
+    """
+    connection = connections[next(iter(querysets.values())).db]
+    part_limit = None
+    if len(querysets) > 1 and connection.features.supports_slicing_ordering_in_compound:
+        # The parts of the union are limited too, so each of them reads at most `limit` rows
+        part_limit = limit
+    parts = [
+        _ledger_rows(queryset, kind, after, part_limit)
+        for kind, queryset in querysets.items()
+    ]
+    rows = parts[0]
+    if len(parts) > 1:
+        rows = rows.union(*parts[1:], all=True)
+    rows = rows.order_by(*LEDGER_ORDERING)
+    if limit is not None:
+        rows = rows[:limit]
+    return [dict(zip(LEDGER_COLUMNS, row)) for row in rows]
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from family_budget.models import Budget
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the monthly totals of budgets from their incomes and expenses, e.g. after "
+        "migrating existing data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "budget_ids",
+            nargs="*",
+            type=int,
+            help="Budgets to rebuild, all of them by default",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Number of budgets rebuilt per transaction",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        budgets = Budget.objects.order_by("pk")
+        if options["budget_ids"]:
+            budgets = budgets.filter(pk__in=options["budget_ids"])
+        budget_ids = list(budgets.values_list("pk", flat=True))
+
+        rows = 0
+        for start in range(0, len(budget_ids), chunk_size):
+            chunk = budget_ids[start : start + chunk_size]
+            rows += Budget.objects.filter(pk__in=chunk).rebuild_period_totals()
+            self.stdout.write(f"Rebuilt budgets {chunk[0]}-{chunk[-1]}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {rows} monthly total(s) of {len(budget_ids)} budget(s)"
+            )
+        )
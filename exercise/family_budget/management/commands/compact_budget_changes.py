@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from family_budget.changes import compact_changes
+from family_budget.models import BudgetChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Compact the change log of the sync feed, keeping only the latest change of every object, "
+        "e.g. periodically from a cron job"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "budget_ids",
+            nargs="*",
+            type=int,
+            help="Budgets to compact, all of them by default",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Number of budgets compacted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        changes = BudgetChange.objects.order_by("budget_id")
+        if options["budget_ids"]:
+            changes = changes.filter(budget_id__in=options["budget_ids"])
+        budget_ids = list(changes.values_list("budget_id", flat=True).distinct())
+
+        deleted = 0
+        for start in range(0, len(budget_ids), chunk_size):
+            chunk = budget_ids[start : start + chunk_size]
+            deleted += compact_changes(chunk)
+            self.stdout.write(f"Compacted budgets {chunk[0]}-{chunk[-1]}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} change(s) of {len(budget_ids)} budget(s)"
+            )
+        )
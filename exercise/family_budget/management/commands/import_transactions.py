@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from family_budget.imports import ImportReport, import_transactions
+from family_budget.models import Budget
+
+
+class Command(BaseCommand):
+    help = (
+        "Import incomes and expenses of a budget from a CSV file with `type`, `amount` and "
+        "`category` columns"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("budget_id", type=int)
+        parser.add_argument("path", help="Path of the CSV file")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.IMPORT_CHUNK_SIZE,
+            help="Number of valid rows loaded at once",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            budget = Budget.objects.get(pk=options["budget_id"])
+        except Budget.DoesNotExist:
+            raise CommandError(f"Budget {options['budget_id']} does not exist")
+
+        def on_reject(line, errors):
+            self.stderr.write(f"Line {line} rejected: {errors}")
+
+        with open(options["path"], encoding="utf-8-sig", newline="") as file:
+            try:
+                report = import_transactions(
+                    budget,
+                    file,
+                    options["chunk_size"],
+                    report=ImportReport(max_reported=0),
+                    on_reject=on_reject,
+                )
+            except ValidationError as error:
+                raise CommandError(error.message)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report.created['income']} income(s) and "
+                f"{report.created['expense']} expense(s), "
+                f"rejected {report.rejected_count} row(s)"
+            )
+        )
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from family_budget.models import Budget
+
+
+class Command(BaseCommand):
+    help = (
+        "Detect budgets whose denormalized income/expense totals drifted from their "
+        "incomes and expenses and rebuild them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted budgets and exit with an error if there are any",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild the totals of every budget, not only the drifted ones",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of budgets rebuilt per UPDATE statement",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        budgets = Budget.objects.order_by("pk")
+        if options["all"]:
+            budget_ids = list(budgets.values_list("pk", flat=True))
+        else:
+            budget_ids = []
+            for budget in budgets.with_drifted_totals().iterator(chunk_size=chunk_size):
+                budget_ids.append(budget.pk)
+                self.stdout.write(
+                    f"{budget}: incomes {budget.income_total}/{budget.income_count}, "
+                    f"expected {budget.computed_income_total}/{budget.computed_income_count}; "
+                    f"expenses {budget.expense_total}/{budget.expense_count}, "
+                    f"expected {budget.computed_expense_total}/{budget.computed_expense_count}"
+                )
+
+        if options["check"]:
+            if budget_ids:
+                raise CommandError(f"{len(budget_ids)} budget(s) with drifted totals")
+            self.stdout.write(self.style.SUCCESS("Budget totals are consistent"))
+            return
+
+        with transaction.atomic():
+            for start in range(0, len(budget_ids), chunk_size):
+                Budget.objects.filter(
+                    pk__in=budget_ids[start : start + chunk_size]
+                ).rebuild_totals()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt totals of {len(budget_ids)} budget(s)")
+        )
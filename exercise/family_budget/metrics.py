@@ -0,0 +1,150 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetrics:
+    """
+    Number of queries and time spent per phase (`db`, `serializer`, `view`, ...) of a request.
+    It is installed as an execute wrapper of the database connections to count the queries.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = {}
+
+    def add(self, phase, seconds):
+        self.durations[phase] = self.durations.get(phase, 0) + seconds
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def timed(self, phase, func):
+        """
+        Wrap `func` so that its calls are timed as `phase`
+        """
+
+        def _timed(*args, **kwargs):
+            with self.timer(phase):
+                return func(*args, **kwargs)
+
+        return _timed
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        with self.timer("db"):
+            return execute(sql, params, many, context)
+
+    def server_timing(self):
+        """
+        Value of the `Server-Timing` header, durations in milliseconds
+        """
+        db_ms = self.durations.get("db", 0) * 1000
+        metrics = [f'db;dur={db_ms:.1f};desc="{self.queries} queries"']
+        metrics.extend(
+            f"{phase};dur={seconds * 1000:.1f}"
+            for phase, seconds in self.durations.items()
+            if phase != "db"
+        )
+        return ", ".join(metrics)
+
+
+def get_request_metrics(request):
+    """
+    Return the metrics of the request, None unless `RequestMetricsMiddleware` is enabled
+    """
+    return getattr(request, "_request_metrics", None)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the queries and timings of every request, enabled with the `REQUEST_METRICS` setting.
+    They are returned in the `Server-Timing` header and logged, with a warning for requests running
+    more queries than `REQUEST_METRICS_QUERY_BUDGET`, if set.
+    It supports async requests, so that async views are not run through a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        request._request_metrics = metrics
+        with ExitStack() as stack:
+            self.wrap_connections(stack, metrics)
+            with metrics.timer("total"):
+                response = self.get_response(request)
+        self.process_response(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        request._request_metrics = metrics
+        # Connections are per thread, the async ORM runs the queries of the request in a thread of
+        # its own, so the execute wrappers are installed and removed in that thread
+        stack = ExitStack()
+        await sync_to_async(self.wrap_connections)(stack, metrics)
+        try:
+            with metrics.timer("total"):
+                response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.process_response(request, response, metrics)
+        return response
+
+    @staticmethod
+    def wrap_connections(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def process_response(self, request, response, metrics):
+        response["Server-Timing"] = metrics.server_timing()
+        budget = settings.REQUEST_METRICS_QUERY_BUDGET
+        over_budget = budget is not None and metrics.queries > budget
+        if over_budget:
+            response["X-Query-Budget-Exceeded"] = f"{metrics.queries}/{budget}"
+
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            "%s %s status=%s queries=%s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            metrics.queries,
+            " ".join(
+                f"{phase}_ms={seconds * 1000:.1f}"
+                for phase, seconds in metrics.durations.items()
+            ),
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "queries": metrics.queries,
+                "durations_ms": {
+                    phase: round(seconds * 1000, 1)
+                    for phase, seconds in metrics.durations.items()
+                },
+                "query_budget_exceeded": over_budget,
+            },
+        )
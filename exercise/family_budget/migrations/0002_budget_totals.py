@@ -0,0 +1,61 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:31
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_totals(apps, schema_editor):
+    Budget = apps.get_model('family_budget', 'Budget')
+    totals = {}
+    for prefix, model_name in (('income', 'Income'), ('expense', 'Expense')):
+        rows = (
+            apps.get_model('family_budget', model_name)
+            .objects.filter(budget=OuterRef('pk'))
+            .order_by()
+            .values('budget')
+        )
+        totals[f'{prefix}_total'] = Coalesce(
+            Subquery(rows.annotate(sum=Sum('amount')).values('sum')),
+            Value(Decimal(0)),
+            output_field=models.DecimalField(),
+        )
+        totals[f'{prefix}_count'] = Coalesce(
+            Subquery(rows.annotate(count=Count('pk')).values('count')),
+            0,
+            output_field=models.IntegerField(),
+        )
+    Budget.objects.update(**totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family_budget', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='expense_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='expense_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='income_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='income_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.RunPython(populate_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family_budget', '0002_budget_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['owner', 'id'], name='budget_owner_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['budget', 'id'], name='expense_budget_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['budget', 'id'], name='income_budget_id_idx'),
+        ),
+    ]
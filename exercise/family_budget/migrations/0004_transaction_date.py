@@ -0,0 +1,33 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def set_existing_dates(apps, schema_editor):
+    # Existing incomes and expenses have no known date, date them on the day of the migration
+    today = django.utils.timezone.localdate()
+    for model_name in ('Income', 'Expense'):
+        model = apps.get_model('family_budget', model_name)
+        model.objects.filter(date__isnull=True).update(date=today)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family_budget', '0003_access_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(set_existing_dates, migrations.RunPython.noop),
+    ]
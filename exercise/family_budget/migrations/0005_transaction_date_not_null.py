@@ -0,0 +1,34 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    # Separate from 0004 so that the data migration and the schema changes run in separate
+    # transactions, which PostgreSQL requires
+
+    dependencies = [
+        ('family_budget', '0004_transaction_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AlterField(
+            model_name='income',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['budget', 'date'], name='expense_budget_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['budget', 'date'], name='income_budget_date_idx'),
+        ),
+    ]
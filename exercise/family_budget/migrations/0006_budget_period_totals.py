@@ -0,0 +1,31 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family_budget', '0005_transaction_date_not_null'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetPeriodTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('category', models.CharField(choices=[('HOUSING', 'Housing'), ('TRANSPORTATION', 'Transportation'), ('FOOD', 'Food'), ('MEDICAL_AND_HEALTHCARE', 'Medical & Healthcare'), ('UTILITIES', 'Utilities'), ('SAVING_AND_DEBT_PAYMENTS', 'Saving & Debt Payments'), ('INSURANCE', 'Insurance'), ('WORK', 'Work'), ('OTHER', 'Other')], max_length=100)),
+                ('income_total', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14)),
+                ('income_count', models.IntegerField(default=0, editable=False)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14)),
+                ('expense_count', models.IntegerField(default=0, editable=False)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_totals', to='family_budget.budget')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='budgetperiodtotal',
+            constraint=models.UniqueConstraint(fields=('budget', 'period', 'category'), name='budget_period_category_unique'),
+        ),
+    ]
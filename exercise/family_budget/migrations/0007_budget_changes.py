@@ -0,0 +1,65 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:55
+
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def log_existing_objects(apps, schema_editor):
+    """
+    Log every existing budget, income and expense as upserted under version 1 of its budget, so
+    that clients syncing from the beginning get them
+    """
+    Budget = apps.get_model('family_budget', 'Budget')
+    BudgetChange = apps.get_model('family_budget', 'BudgetChange')
+
+    def entries():
+        for budget_id in Budget.objects.values_list('pk', flat=True).iterator():
+            yield budget_id, 'budget', budget_id
+        for change_type, model_name in (('income', 'Income'), ('expense', 'Expense')):
+            rows = apps.get_model('family_budget', model_name).objects.values_list('budget_id', 'pk')
+            for budget_id, pk in rows.iterator():
+                yield budget_id, change_type, pk
+
+    # `bulk_create` would hold all the changes in memory, they are created in batches
+    changes = (
+        BudgetChange(budget_id=budget_id, version=1, type=change_type, object_id=object_id, action='upsert')
+        for budget_id, change_type, object_id in entries()
+    )
+    while batch := list(islice(changes, 1000)):
+        BudgetChange.objects.bulk_create(batch)
+    Budget.objects.update(version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('family_budget', '0006_budget_period_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='BudgetChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('budget_id', models.BigIntegerField()),
+                ('version', models.PositiveBigIntegerField()),
+                ('type', models.CharField(choices=[('budget', 'Budget'), ('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('object_id', models.BigIntegerField(null=True)),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted'), ('refresh', 'Refresh')], max_length=10)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['budget_id', 'version'], name='budgetchange_version_idx')],
+            },
+        ),
+        migrations.RunPython(log_existing_objects, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family_budget', '0007_budget_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='updated_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family_budget', '0008_budget_updated_at'),
+    ]
+
+    operations = [
+        # The new indexes are created before the ones they replace are dropped, so queries are
+        # never left without an index
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['budget', 'date', 'id'], name='expense_budget_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['budget', 'date', 'id'], name='income_budget_date_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='expense_budget_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='income',
+            name='income_budget_date_idx',
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:28
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_changes(apps, schema_editor):
+    """
+    Number the existing changes by id, which is in order of version within a budget
+    """
+    BudgetChange = apps.get_model('family_budget', 'BudgetChange')
+    BudgetChange.objects.update(sequence=F('pk'))
+    last = BudgetChange.objects.aggregate(last=Max('sequence'))['last'] or 0
+    apps.get_model('family_budget', 'BudgetChangeSequence').objects.create(pk=1, last=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('family_budget', '0009_transaction_budget_date_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='budgetchange',
+            name='sequence',
+            field=models.PositiveBigIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,138 @@
-from django.db import models
-from django.db.models import Sum
+from decimal import Decimal
 
-from .choices import CategoryChoices
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .choices import CategoryChoices, ChangeActionChoices, ChangeTypeChoices
+from .signals import transactions_changed
+
+
+# Fields of incomes and expenses that their totals depend on
+TOTALS_FIELDS = ("budget", "amount", "category", "date")
+
+
+def _shift(deltas, values, sign):
+    """
+    Accumulate in `deltas` the change of totals caused by adding (`sign` 1) or removing (`sign` -1)
+    an income/expense with the given `TOTALS_FIELDS` values.
+    `deltas` are `{(budget_id, period, category): (amount, count)}`, the period being the first day
+    of the month.
+    """
+    key = (values["budget"], values["date"].replace(day=1), values["category"])
+    amount, count = deltas.get(key, (Decimal(0), 0))
+    deltas[key] = (amount + sign * values["amount"], count + sign)
+
+
+def _budget_deltas(deltas):
+    """
+    Sum `_shift` deltas by budget
+    """
+    budget_deltas = {}
+    for (budget_id, _, _), (amount, count) in deltas.items():
+        budget_amount, budget_count = budget_deltas.get(budget_id, (Decimal(0), 0))
+        budget_deltas[budget_id] = (budget_amount + amount, budget_count + count)
+    return budget_deltas
+
+
+def _moved(pk, old, new):
+    """
+    Changes of an updated income/expense given its old and new `TOTALS_FIELDS` values, it is
+    deleted from its old budget if it has been moved to another one
+    """
+    changes = [(ChangeActionChoices.UPSERT, pk, new["budget"])]
+    if old["budget"] != new["budget"]:
+        changes.insert(0, (ChangeActionChoices.DELETE, pk, old["budget"]))
+    return changes
+
+
+class IncomeExpenseQuerySet(models.QuerySet):
+    def accessible_to(self, user):
+        """
+        Filter incomes/expenses of the budgets that the user has access to
+        """
+        return self.filter(budget__in=Budget.objects.accessible_to(user).values("pk"))
+
+    def locked_totals_values(self, pks):
+        """
+        Fetch `TOTALS_FIELDS` values stored in the database by pk, locking the rows until the end of
+        the transaction
+        """
+        return {
+            row["pk"]: row
+            for row in self.model.objects.select_for_update()
+            .filter(pk__in=pks)
+            .order_by("pk")
+            .values("pk", *TOTALS_FIELDS)
+        }
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Override `bulk_create` method to keep the denormalized totals of the affected budgets in
+        sync
+        """
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            deltas = {}
+            for obj in objs:
+                _shift(deltas, obj.totals_values(), 1)
+            changes = None
+            if all(obj.pk is not None for obj in objs):
+                changes = [
+                    (ChangeActionChoices.UPSERT, obj.pk, obj.budget_id) for obj in objs
+                ]
+            self.model.update_totals(deltas, changes)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """
+        Override `bulk_update` method to keep the denormalized totals of the affected budgets in
+        sync
+        """
+        with transaction.atomic(using=self.db):
+            objs = list(objs)
+            stored = self.locked_totals_values([obj.pk for obj in objs])
+            result = super().bulk_update(objs, fields, *args, **kwargs)
+
+            deltas = {}
+            changes = []
+            for obj in objs:
+                old = stored.get(obj.pk)
+                if old is None:
+                    continue
+                new = obj.totals_values(stored=old, fields=fields)
+                _shift(deltas, old, -1)
+                _shift(deltas, new, 1)
+                changes.extend(_moved(obj.pk, old, new))
+            self.model.update_totals(deltas, changes)
+        return result
+
+    def delete(self):
+        """
+        Override `delete` method to keep the denormalized totals of the affected budgets in sync
+        """
+        with transaction.atomic(using=self.db):
+            changes = [
+                (ChangeActionChoices.DELETE, pk, budget_id)
+                for pk, budget_id in self.values_list("pk", "budget")
+            ]
+            removed = (
+                self.order_by()
+                .annotate(period=TruncMonth("date"))
+                .values("budget", "period", "category")
+                .annotate(amount=Sum("amount"), count=Count("pk"))
+            )
+            deltas = {
+                (row["budget"], row["period"], row["category"]): (
+                    -row["amount"],
+                    -row["count"],
+                )
+                for row in removed
+            }
+            result = super().delete()
+            self.model.update_totals(deltas, changes)
+        return result
 
 
 class IncomeExpense(models.Model):
@@ -13,9 +144,118 @@ class IncomeExpense(models.Model):
     category = models.CharField(
         choices=CategoryChoices.choices, default=CategoryChoices.OTHER, max_length=100
     )
+    date = models.DateField(default=timezone.localdate)
+
+    objects = IncomeExpenseQuerySet.as_manager()
+
+    # Names of the `Budget` and `BudgetPeriodTotal` columns holding the totals of the concrete model
+    total_field = None
+    count_field = None
 
     class Meta:
         abstract = True
+        indexes = [
+            models.Index(fields=["budget", "id"], name="%(class)s_budget_id_idx"),
+            models.Index(
+                fields=["budget", "date", "id"], name="%(class)s_budget_date_id_idx"
+            ),
+        ]
+
+    @classmethod
+    def update_totals(cls, deltas, changes=None):
+        """
+        Shift the denormalized totals of budgets and their monthly totals by the deltas accumulated
+        with `_shift`. F-expressions are used so concurrent writes do not overwrite each other.
+        Every write of incomes/expenses goes through this method, so it also sends
+        `transactions_changed` for all the budgets in `deltas`, with the `changes` made, as
+        `(action, pk, budget_id)`, when they are known. The version of the budgets is incremented,
+        and their update time set, by the same UPDATE as their totals, the changes are logged
+        under it.
+        """
+        budget_deltas = _budget_deltas(deltas)
+        now = timezone.now()
+        # Rows are locked in a consistent order, so that concurrent writes of several budgets do
+        # not deadlock. A budget row is updated, and so locked, even when its total is unchanged,
+        # e.g. when an income is moved to another month, as its period totals are shifted below.
+        for budget_id, (amount, count) in sorted(budget_deltas.items()):
+            Budget.objects.filter(pk=budget_id).update(
+                **{
+                    cls.total_field: F(cls.total_field) + amount,
+                    cls.count_field: F(cls.count_field) + count,
+                },
+                version=F("version") + 1,
+                updated_at=now,
+            )
+        # Budget rows are locked first, as in `BudgetQuerySet.rebuild_period_totals`
+        for (budget_id, period, category), (amount, count) in sorted(deltas.items()):
+            if amount or count:
+                BudgetPeriodTotal.objects.shift(
+                    budget_id,
+                    period,
+                    category,
+                    **{cls.total_field: amount, cls.count_field: count},
+                )
+        if budget_deltas:
+            transactions_changed.send(
+                sender=cls, budget_ids=list(budget_deltas), changes=changes
+            )
+
+    def totals_values(self, stored=None, fields=None):
+        """
+        Return the `TOTALS_FIELDS` values of this object. When `fields` are given, the values of the
+        other fields are taken from the `stored` ones.
+        """
+        values = {}
+        for name in TOTALS_FIELDS:
+            if fields is not None and name not in fields:
+                values[name] = stored[name]
+            else:
+                field = self._meta.get_field(name)
+                values[name] = field.to_python(getattr(self, field.attname))
+        return values
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            stored = None
+            if not self._state.adding:
+                stored = type(self).objects.locked_totals_values([self.pk]).get(self.pk)
+            super().save(*args, **kwargs)
+
+            deltas = {}
+            new = self.totals_values()
+            changes = [(ChangeActionChoices.UPSERT, self.pk, new["budget"])]
+            if stored is not None:
+                _shift(deltas, stored, -1)
+                changes = _moved(self.pk, stored, new)
+            _shift(deltas, new, 1)
+            self.update_totals(deltas, changes)
+        self._shift_cached_budget_totals(deltas)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            pk = self.pk
+            stored = type(self).objects.locked_totals_values([pk]).get(pk)
+            result = super().delete(*args, **kwargs)
+
+            deltas = {}
+            changes = []
+            if stored is not None:
+                _shift(deltas, stored, -1)
+                changes.append((ChangeActionChoices.DELETE, pk, stored["budget"]))
+            self.update_totals(deltas, changes)
+        self._shift_cached_budget_totals(deltas)
+        return result
+
+    def _shift_cached_budget_totals(self, deltas):
+        """
+        Apply the totals deltas to the budget instance cached on this object, if any, so it does not
+        have to be refreshed from the database
+        """
+        if not type(self).budget.is_cached(self) or self.budget is None:
+            return
+        amount, count = _budget_deltas(deltas).get(self.budget.pk, (0, 0))
+        for field, delta in ((self.total_field, amount), (self.count_field, count)):
+            setattr(self.budget, field, getattr(self.budget, field) + delta)
 
 
 class Income(IncomeExpense):
@@ -23,6 +263,9 @@ class Income(IncomeExpense):
         "Budget", related_name="incomes", on_delete=models.CASCADE
     )
 
+    total_field = "income_total"
+    count_field = "income_count"
+
     def __str__(self):
         return f"Income {self.pk} from budget {self.budget.name}"
 
@@ -32,10 +275,130 @@ class Expense(IncomeExpense):
         "Budget", related_name="expenses", on_delete=models.CASCADE
     )
 
+    total_field = "expense_total"
+    count_field = "expense_count"
+
     def __str__(self):
         return f"Expense {self.pk} from budget {self.budget.name}"
 
 
+def _amount_sum_subquery(model):
+    """
+    Subquery summing amounts of the given incomes/expenses model for the outer budget
+    """
+    amounts = (
+        model.objects.filter(budget=OuterRef("pk"))
+        .order_by()
+        .values("budget")
+        .annotate(sum=Sum("amount"))
+        .values("sum")
+    )
+    return Coalesce(
+        Subquery(amounts), Value(Decimal(0)), output_field=models.DecimalField()
+    )
+
+
+def _count_subquery(model):
+    """
+    Subquery counting the given incomes/expenses model rows for the outer budget
+    """
+    counts = (
+        model.objects.filter(budget=OuterRef("pk"))
+        .order_by()
+        .values("budget")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts), 0, output_field=models.IntegerField())
+
+
+class BudgetQuerySet(models.QuerySet):
+    def accessible_to(self, user):
+        """
+        Filter budgets owned by or shared with the user.
+        Shares are checked with an `EXISTS` subquery rather than a join, so every budget is returned
+        once however many users it is shared with.
+        """
+        shares = self.model.shared_with.through.objects.filter(
+            budget=OuterRef("pk"), user=user
+        )
+        return self.filter(Q(owner=user) | Exists(shares))
+
+    def with_revenue(self):
+        """
+        Annotate budgets with their revenue, read from the denormalized totals, e.g. to filter or
+        order budgets by it
+        """
+        return self.annotate(annotated_revenue=F("income_total") - F("expense_total"))
+
+    def with_computed_totals(self):
+        """
+        Annotate budgets with totals aggregated from their incomes and expenses, as opposed to the
+        denormalized values stored on the budget
+        """
+        return self.annotate(
+            computed_income_total=_amount_sum_subquery(Income),
+            computed_income_count=_count_subquery(Income),
+            computed_expense_total=_amount_sum_subquery(Expense),
+            computed_expense_count=_count_subquery(Expense),
+        )
+
+    def with_drifted_totals(self):
+        """
+        Filter budgets whose denormalized totals differ from the aggregated incomes and expenses
+        """
+        return self.with_computed_totals().exclude(
+            income_total=F("computed_income_total"),
+            income_count=F("computed_income_count"),
+            expense_total=F("computed_expense_total"),
+            expense_count=F("computed_expense_count"),
+        )
+
+    def rebuild_totals(self):
+        """
+        Recompute the denormalized totals of budgets from their incomes and expenses
+        """
+        return self.update(
+            income_total=_amount_sum_subquery(Income),
+            income_count=_count_subquery(Income),
+            expense_total=_amount_sum_subquery(Expense),
+            expense_count=_count_subquery(Expense),
+        )
+
+    def rebuild_period_totals(self):
+        """
+        Recompute the monthly totals of budgets from their incomes and expenses.
+        The budgets are locked first, so writes of their incomes and expenses wait for the rebuild.
+        """
+        with transaction.atomic(using=self.db):
+            budget_ids = list(
+                self.select_for_update().order_by("pk").values_list("pk", flat=True)
+            )
+            period_totals = {}
+            for model in (Income, Expense):
+                rows = (
+                    model.objects.filter(budget__in=budget_ids)
+                    .order_by()
+                    .annotate(period=TruncMonth("date"))
+                    .values("budget", "period", "category")
+                    .annotate(total=Sum("amount"), count=Count("pk"))
+                )
+                for row in rows:
+                    key = (row["budget"], row["period"], row["category"])
+                    if key not in period_totals:
+                        period_totals[key] = BudgetPeriodTotal(
+                            budget_id=row["budget"],
+                            period=row["period"],
+                            category=row["category"],
+                        )
+                    setattr(period_totals[key], model.total_field, row["total"])
+                    setattr(period_totals[key], model.count_field, row["count"])
+
+            BudgetPeriodTotal.objects.filter(budget__in=budget_ids).delete()
+            BudgetPeriodTotal.objects.bulk_create(period_totals.values())
+        return len(period_totals)
+
+
 class Budget(models.Model):
     name = models.CharField(max_length=100)
     owner = models.ForeignKey(
@@ -45,15 +408,141 @@ class Budget(models.Model):
         "auth.User", related_name="shared_budgets", blank=True
     )
 
+    # Denormalized totals maintained on every income/expense write, see `IncomeExpense`
+    income_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    income_count = models.PositiveIntegerField(default=0, editable=False)
+    expense_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    expense_count = models.PositiveIntegerField(default=0, editable=False)
+    # Incremented on every change of the budget, its incomes, expenses or shares, see `changes`
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+    # Time of the last version, None for budgets unchanged since versions were introduced
+    updated_at = models.DateTimeField(null=True, editable=False)
+
+    objects = BudgetQuerySet.as_manager()
+
+    totals_fields = ("income_total", "income_count", "expense_total", "expense_count")
+    # Fields maintained with queryset updates, never written by `save`
+    maintained_fields = totals_fields + ("version", "updated_at")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "id"], name="budget_owner_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} (id: {self.pk})"
 
+    def save(self, *args, **kwargs):
+        """
+        Override `save` method so that updating a budget never writes its denormalized totals and
+        version, which may be outdated in this instance
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.maintained_fields
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def revenue(self):
-        incomes_sum = (
-            self.incomes.aggregate(sum=Sum('amount'))['sum'] if self.incomes.exists() else 0
-        )
-        expenses_sum = (
-            self.expenses.aggregate(sum=Sum('amount'))['sum'] if self.expenses.exists() else 0
-        )
-        return incomes_sum - expenses_sum
+        return self.income_total - self.expense_total
+
+
+class BudgetPeriodTotalQuerySet(models.QuerySet):
+    def shift(self, budget_id, period, category, **increments):
+        """
+        Add `increments` to the totals columns of the budget period and category, creating the row
+        if it does not exist yet
+        """
+        lookup = {"budget_id": budget_id, "period": period, "category": category}
+        updates = {name: F(name) + value for name, value in increments.items()}
+        if self.filter(**lookup).update(**updates):
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(**lookup, **increments)
+        except IntegrityError:
+            # The row has been created concurrently
+            self.filter(**lookup).update(**updates)
+
+
+class BudgetPeriodTotal(models.Model):
+    """
+    Monthly totals of a budget incomes and expenses by category, maintained on every write of
+    incomes and expenses, see `IncomeExpense.update_totals`
+    """
+
+    budget = models.ForeignKey(
+        "Budget", related_name="period_totals", on_delete=models.CASCADE
+    )
+    # First day of the month
+    period = models.DateField()
+    category = models.CharField(choices=CategoryChoices.choices, max_length=100)
+    income_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    # Counts may go negative when rows are shifted before `backfill_period_totals` has run
+    income_count = models.IntegerField(default=0, editable=False)
+    expense_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    expense_count = models.IntegerField(default=0, editable=False)
+
+    objects = BudgetPeriodTotalQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["budget", "period", "category"],
+                name="budget_period_category_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.budget_id} {self.period:%Y-%m} {self.category}"
+
+
+class BudgetChange(models.Model):
+    """
+    Change log entry of a budget, logged under the budget version it led to. Entries with a `user`
+    are only meant for that user, e.g. the budget has been deleted or is no longer shared with them.
+    The budget is not a foreign key so that the entries outlive deleted budgets.
+    Committed entries are numbered by `changes.sequence_changes`, clients sync from a `sequence`.
+    """
+
+    budget_id = models.BigIntegerField()
+    version = models.PositiveBigIntegerField()
+    sequence = models.PositiveBigIntegerField(null=True, unique=True, editable=False)
+    type = models.CharField(choices=ChangeTypeChoices.choices, max_length=10)
+    object_id = models.BigIntegerField(null=True)
+    action = models.CharField(choices=ChangeActionChoices.choices, max_length=10)
+    user = models.ForeignKey(
+        "auth.User", null=True, related_name="+", on_delete=models.CASCADE
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["budget_id", "version"], name="budgetchange_version_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.budget_id}@{self.version} {self.action} {self.type} {self.object_id}"
+
+
+class BudgetChangeSequence(models.Model):
+    """
+    Last number given to a `BudgetChange`, a single row locked while numbering the changes
+    """
+
+    last = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.last)
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from datetime import date
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Count
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+from .ledger import LEDGER_ORDERING, ledger
+
+
+class TotalsPaginator(Paginator):
+    """
+    Paginator computing `aggregates` of the whole object list in the same query as the count
+    """
+
+    def __init__(self, object_list, per_page, aggregates=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.aggregates = aggregates
+
+    @cached_property
+    def totals(self):
+        return self.object_list.order_by().aggregate(
+            count=Count("pk"), **self.aggregates
+        )
+
+    @cached_property
+    def count(self):
+        if not self.aggregates:
+            return super().count
+        return self.totals["count"]
+
+
+class TotalsPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination which, when the view sets `aggregates` for the request, computes them
+    over the whole list together with the page count, see `get_totals`
+    """
+
+    aggregates = None
+
+    @property
+    def django_paginator_class(self):
+        return partial(TotalsPaginator, aggregates=self.aggregates)
+
+    def get_totals(self, queryset):
+        """
+        Return the count and `aggregates` of the whole paginated queryset
+        """
+        return self.page.paginator.totals
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Async version of `paginate_queryset`, counting and fetching the page with the async ORM
+        """
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        if self.aggregates:
+            paginator.totals = await queryset.order_by().aaggregate(
+                count=Count("pk"), **self.aggregates
+            )
+        else:
+            paginator.count = await queryset.acount()
+
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        self.page.object_list = [
+            obj async for obj in self.page.object_list.aiterator()
+        ]
+        self.request = request
+        return self.page.object_list
+
+
+class MaxPageSizeMixin:
+    """
+    Mixin class capping the requested `page_size` at the `CURSOR_PAGINATION_MAX_PAGE_SIZE`
+    setting, read for every request
+    """
+
+    def get_page_size(self, request):
+        self.max_page_size = settings.CURSOR_PAGINATION_MAX_PAGE_SIZE
+        return super().get_page_size(request)
+
+
+class PkCursorPagination(MaxPageSizeMixin, CursorPagination):
+    """
+    Keyset pagination ordered by the primary key, selected with `?pagination=cursor`.
+    Unlike the default page number pagination it neither counts the rows nor skips them with an
+    `OFFSET`, so deep pages cost the same as the first one.
+    """
+
+    ordering = "pk"
+    page_size_query_param = "page_size"
+    aggregates = None
+
+    def get_totals(self, queryset):
+        """
+        Return the count and `aggregates` of the whole paginated queryset. Cursor pages are not
+        counted, so this is an additional query.
+        """
+        return queryset.order_by().aggregate(count=Count("pk"), **self.aggregates)
+
+
+class LedgerCursorPagination(MaxPageSizeMixin, CursorPagination):
+    """
+    Keyset pagination of the transactions `ledger`, following the `next` links only. The cursor
+    encodes the `(date, type, id)` position of the last transaction of the page.
+    """
+
+    ordering = LEDGER_ORDERING
+    page_size_query_param = "page_size"
+
+    def paginate_ledger(self, querysets, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position = None
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            try:
+                day, kind, pk = cursor.position.split("|")
+                position = (date.fromisoformat(day), kind, int(pk))
+            except (AttributeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = ledger(querysets, after=position, limit=self.page_size + 1)
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = f"{last['date'].isoformat()}|{last['type']}|{last['id']}"
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([("next", self.get_next_link()), ("results", data)]))
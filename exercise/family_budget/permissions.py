@@ -1,14 +1,22 @@
 from rest_framework import permissions
 
+from .access import get_budget_access
+
 
 class IsBudgetOwnerOrSharedWith(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return bool(request.user == obj.owner or request.user in obj.shared_with.all())
+        return get_budget_access(request).has_access(obj)
+
+    async def ahas_object_permission(self, request, view, obj):
+        return await get_budget_access(request).ahas_access(obj)
 
 
 class IsIncomeExpenseOwnerOrSharedWith(permissions.BasePermission):
+    # The budget is passed rather than its id, so that owners are recognized without a query when
+    # the budget is selected along with the income/expense
+
     def has_object_permission(self, request, view, obj):
-        return bool(
-            request.user == obj.budget.owner
-            or request.user in obj.budget.shared_with.all()
-        )
+        return get_budget_access(request).has_access(obj.budget)
+
+    async def ahas_object_permission(self, request, view, obj):
+        return await get_budget_access(request).ahas_access(obj.budget)
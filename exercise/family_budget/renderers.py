@@ -0,0 +1,99 @@
+import codecs
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSON renderer encoding with `orjson`, when it is installed, several times faster than the
+    standard library on large lists. The output is the one of `JSONRenderer`: types `orjson`
+    does not encode, e.g. decimals and lazy translations, go through its encoder.
+    Indented responses, e.g. of the browsable API, and data that `orjson` rejects, e.g. integers
+    over 64 bits, are rendered by `JSONRenderer`.
+    """
+
+    # Dates are encoded natively, UTC datetimes with a "Z" as `JSONRenderer` does
+    options = 0 if orjson is None else orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like `JSONRenderer` does, so the output is a strict javascript subset
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
+
+
+class FastJSONParser(parsers.JSONParser):
+    """
+    JSON parser decoding with `orjson` when it is installed, see `FastJSONRenderer`
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """
+    Renderer selecting the CSV format for streamed exports. Exported rows are streamed by the view
+    itself, the renderer only renders other responses, e.g. errors, as a header and a single row
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(data.keys())
+        writer.writerow(data.values())
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """
+    Renderer selecting the newline delimited JSON format for streamed exports. Exported rows are
+    streamed by the view itself, the renderer only renders other responses, e.g. errors, as a
+    single line
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return (json.dumps(data, cls=DjangoJSONEncoder) + "\n").encode(self.charset)
@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.urls import reverse
+from django.utils.http import urlencode
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import Cursor
 
-from .models import Budget, Expense, Income
+from .access import get_budget_access
+from .models import Budget, BudgetPeriodTotal, Expense, Income
+from .pagination import PkCursorPagination
 
 
 class IncomeExpenseSerializer(serializers.ModelSerializer):
@@ -20,6 +27,7 @@ class IncomeExpenseSerializer(serializers.ModelSerializer):
             "id",
             "amount",
             "category",
+            "date",
             "budget",
             "url",
         ]
@@ -56,6 +64,7 @@ class IncomeExpenseCreateSerializer(serializers.ModelSerializer):
         fields = [
             "amount",
             "category",
+            "date",
             "budget",
         ]
 
@@ -64,9 +73,7 @@ class IncomeExpenseCreateSerializer(serializers.ModelSerializer):
         Override `create` method to allow creating only incomes/expenses for budgets that the user
         has access to (is owner or the budget has been shared with him)
         """
-        budget = validated_data["budget"]
-        user = validated_data.pop("user")
-        if budget.owner == user or user in budget.shared_with.all():
+        if get_budget_access(self.context["request"]).has_access(validated_data["budget"]):
             return super().create(validated_data)
         raise PermissionDenied()
 
@@ -81,6 +88,108 @@ class ExpenseCreateSerializer(IncomeExpenseCreateSerializer):
         model = Expense
 
 
+class IncomeExpenseBulkListSerializer(serializers.ListSerializer):
+    """
+    List serializer writing incomes or expenses in batched statements
+    """
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create(
+            [model(**item) for item in validated_data],
+            batch_size=settings.BULK_CREATE_BATCH_SIZE,
+        )
+
+    def update(self, instance, validated_data):
+        """
+        Update `instance` objects with the items matched by their `id`. Items are grouped by the
+        fields they change, with a `bulk_update` per group, so fields that an item does not send
+        are never written, and concurrent changes to them are kept.
+        """
+        instances = {obj.pk: obj for obj in instance}
+        groups = {}
+        for item in validated_data:
+            obj = instances[item["id"]]
+            fields = []
+            for attr, value in item.items():
+                if attr != "id":
+                    setattr(obj, attr, value)
+                    fields.append("budget" if attr == "budget_id" else attr)
+            if fields:
+                groups.setdefault(tuple(sorted(fields)), []).append(obj)
+
+        for fields, objs in groups.items():
+            self.child.Meta.model.objects.bulk_update(
+                objs, fields, batch_size=settings.BULK_CREATE_BATCH_SIZE
+            )
+        return [instances[item["id"]] for item in validated_data]
+
+
+class IncomeExpenseBulkCreateSerializer(serializers.ModelSerializer):
+    """
+    Abstract serializer for incomes and expenses created in bulk.
+    The budget is taken as a plain id so that the items are validated without querying the
+    database, access to the budgets is checked by the view once for the whole list.
+    """
+
+    budget = serializers.IntegerField(source="budget_id")
+
+    class Meta:
+        abstract = True
+        list_serializer_class = IncomeExpenseBulkListSerializer
+        fields = [
+            "id",
+            "amount",
+            "category",
+            "date",
+            "budget",
+        ]
+        read_only_fields = ["id"]
+
+
+class IncomeExpenseBulkUpdateSerializer(IncomeExpenseBulkCreateSerializer):
+    """
+    Abstract serializer for incomes and expenses updated in bulk, identified by their `id`
+    """
+
+    id = serializers.IntegerField()
+
+    class Meta(IncomeExpenseBulkCreateSerializer.Meta):
+        read_only_fields = []
+
+    def validate(self, attrs):
+        # Bulk updates are partial, so the required `id` has to be checked explicitly
+        if "id" not in attrs:
+            raise serializers.ValidationError(
+                {"id": [self.fields["id"].error_messages["required"]]}
+            )
+        return attrs
+
+
+class IncomeBulkCreateSerializer(IncomeExpenseBulkCreateSerializer):
+    class Meta(IncomeExpenseBulkCreateSerializer.Meta):
+        model = Income
+
+
+class ExpenseBulkCreateSerializer(IncomeExpenseBulkCreateSerializer):
+    class Meta(IncomeExpenseBulkCreateSerializer.Meta):
+        model = Expense
+
+
+class IncomeBulkUpdateSerializer(IncomeExpenseBulkUpdateSerializer):
+    class Meta(IncomeExpenseBulkUpdateSerializer.Meta):
+        model = Income
+
+
+class ExpenseBulkUpdateSerializer(IncomeExpenseBulkUpdateSerializer):
+    class Meta(IncomeExpenseBulkUpdateSerializer.Meta):
+        model = Expense
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
 class IncomeExpenseCreateBudgetSerializer(serializers.ModelSerializer):
     """
     Abstract serializer for incomes and expenses that are created as related objects during
@@ -92,6 +201,7 @@ class IncomeExpenseCreateBudgetSerializer(serializers.ModelSerializer):
         fields = [
             "amount",
             "category",
+            "date",
         ]
 
 
@@ -126,6 +236,58 @@ class BudgetSerializer(serializers.ModelSerializer):
         ]
 
 
+class BoundedBudgetSerializer(BudgetSerializer):
+    """
+    Budget serializer embedding only the first incomes and expenses, prefetched as
+    `first_incomes` and `first_expenses`, with their counts and the links to the next ones
+    """
+
+    incomes = IncomeSerializer(many=True, source="first_incomes")
+    expenses = ExpenseSerializer(many=True, source="first_expenses")
+    incomes_count = serializers.IntegerField(source="income_count")
+    expenses_count = serializers.IntegerField(source="expense_count")
+    incomes_next = serializers.SerializerMethodField()
+    expenses_next = serializers.SerializerMethodField()
+
+    class Meta(BudgetSerializer.Meta):
+        fields = BudgetSerializer.Meta.fields + [
+            "incomes_count",
+            "incomes_next",
+            "expenses_count",
+            "expenses_next",
+        ]
+
+    def get_next_link(self, view_name, budget, items, count):
+        """
+        Link to the cursor paginated list of the budget items following the embedded ones
+        """
+        # The count is denormalized, it may have drifted from the rows
+        if not items or len(items) >= count:
+            return None
+        request = self.context["request"]
+        paginator = PkCursorPagination()
+        paginator.base_url = request.build_absolute_uri(
+            reverse(view_name)
+            + "?"
+            + urlencode(
+                {"budget": budget.pk, "pagination": "cursor", "page_size": len(items)}
+            )
+        )
+        return paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=str(items[-1].pk))
+        )
+
+    def get_incomes_next(self, obj):
+        return self.get_next_link(
+            "incomes-list", obj, obj.first_incomes, obj.income_count
+        )
+
+    def get_expenses_next(self, obj):
+        return self.get_next_link(
+            "expenses-list", obj, obj.first_expenses, obj.expense_count
+        )
+
+
 class BudgetCreateSerializer(serializers.ModelSerializer):
     """
     Budget serializer for creating budget objects with related incomes and expenses
@@ -144,22 +306,112 @@ class BudgetCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """
-        Override `create` method to allow creating incomes and expenses nested inside the budget
+        Override `create` method to allow creating incomes and expenses nested inside the budget.
+        They are inserted in batches of `BULK_CREATE_BATCH_SIZE` rows, all or nothing.
         """
 
         incomes = validated_data.pop("incomes")
         expenses = validated_data.pop("expenses")
-        budget = super().create(validated_data)
+        batch_size = settings.BULK_CREATE_BATCH_SIZE
+
+        with transaction.atomic():
+            budget = super().create(validated_data)
+            Income.objects.bulk_create(
+                (Income(budget=budget, **income) for income in incomes),
+                batch_size=batch_size,
+            )
+            Expense.objects.bulk_create(
+                (Expense(budget=budget, **expense) for expense in expenses),
+                batch_size=batch_size,
+            )
 
-        for income in incomes:
-            income["budget"] = budget
-            Income.objects.create(**income)
+        return budget
 
-        for expense in expenses:
-            expense["budget"] = budget
-            Expense.objects.create(**expense)
 
-        return budget
+class AmountsSummarySerializer(serializers.Serializer):
+    total = serializers.DecimalField(max_digits=None, decimal_places=2)
+    count = serializers.IntegerField()
+    average = serializers.DecimalField(max_digits=None, decimal_places=2)
+    minimum = serializers.DecimalField(max_digits=None, decimal_places=2)
+    maximum = serializers.DecimalField(max_digits=None, decimal_places=2)
+
+
+class TransactionsSummarySerializer(AmountsSummarySerializer):
+    categories = serializers.DictField(child=AmountsSummarySerializer())
+
+
+class SummarySerializer(serializers.Serializer):
+    """
+    Serializer for summaries of incomes and expenses, see `summaries.transactions_summary`
+    """
+
+    revenue = serializers.DecimalField(max_digits=None, decimal_places=2)
+    incomes = TransactionsSummarySerializer()
+    expenses = TransactionsSummarySerializer()
+
+
+class TotalsSerializer(serializers.Serializer):
+    total = serializers.DecimalField(max_digits=None, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class RollupSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    total = serializers.DecimalField(max_digits=None, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class BudgetPeriodTotalSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BudgetPeriodTotal
+        fields = (
+            "period",
+            "category",
+            "income_total",
+            "income_count",
+            "expense_total",
+            "expense_count",
+        )
+
+
+class TransactionSerializer(serializers.Serializer):
+    """
+    Serializer of the rows of the transactions ledger, amounts are negative for expenses
+    """
+
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    budget = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=None, decimal_places=2)
+    category = serializers.CharField()
+    date = serializers.DateField()
+
+
+class SyncBudgetSerializer(BudgetSerializer):
+    """
+    Budget serializer for the sync feed, without the incomes and expenses which are synced on
+    their own
+    """
+
+    incomes_count = serializers.IntegerField(source="income_count")
+    expenses_count = serializers.IntegerField(source="expense_count")
+
+    class Meta(BudgetSerializer.Meta):
+        fields = ["id", "name", "owner", "revenue", "incomes_count", "expenses_count"]
+
+
+class BudgetChangeSerializer(serializers.Serializer):
+    """
+    Serializer of the changes of the sync feed, `data` is the current representation of upserted
+    objects
+    """
+
+    budget = serializers.IntegerField(source="budget_id")
+    version = serializers.IntegerField()
+    type = serializers.CharField()
+    id = serializers.IntegerField(source="object_id", allow_null=True)
+    action = serializers.CharField()
+    data = serializers.JSONField(allow_null=True)
 
 
 class ShareBudgetSerializer(serializers.Serializer):
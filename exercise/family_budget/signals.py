@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent whenever incomes or expenses are created, updated or deleted, including bulk writes that do
+# not send the model signals. Provides `budget_ids` of the affected budgets and the `changes` made,
+# as `(action, pk, budget_id)`, or None when they are not known, e.g. after a `COPY` import.
+# It is sent in the transaction of the write, once the version of the budgets has been incremented.
+transactions_changed = Signal()
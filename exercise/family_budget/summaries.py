@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from django.db.models import Avg, CharField, Count, Max, Min, Sum, Value
+
+SUMMARY_KINDS = ("incomes", "expenses")
+
+
+def _empty_summary():
+    return {
+        "total": Decimal(0),
+        "count": 0,
+        "average": None,
+        "minimum": None,
+        "maximum": None,
+    }
+
+
+def _category_rows(queryset, kind):
+    return (
+        queryset.order_by()
+        .values("category")
+        .annotate(
+            kind=Value(kind, output_field=CharField()),
+            total=Sum("amount"),
+            count=Count("pk"),
+            average=Avg("amount"),
+            minimum=Min("amount"),
+            maximum=Max("amount"),
+        )
+        .values_list(
+            "kind", "category", "total", "count", "average", "minimum", "maximum"
+        )
+    )
+
+
+def transactions_summary(incomes, expenses):
+    """
+    Summarize the incomes and expenses querysets: total, count, average, minimum and maximum
+    amounts, overall and by category, plus the revenue.
+    Both tables are aggregated by the database in a single `UNION ALL` query.
+    """
+    summary = {kind: {**_empty_summary(), "categories": {}} for kind in SUMMARY_KINDS}
+    rows = _category_rows(incomes, "incomes").union(
+        _category_rows(expenses, "expenses"), all=True
+    )
+    for kind, category, total, count, average, minimum, maximum in rows:
+        summary[kind]["categories"][category] = {
+            "total": total,
+            "count": count,
+            "average": average,
+            "minimum": minimum,
+            "maximum": maximum,
+        }
+
+    for kind in SUMMARY_KINDS:
+        overall = summary[kind]
+        categories = overall["categories"].values()
+        if not categories:
+            continue
+        overall["total"] = sum(category["total"] for category in categories)
+        overall["count"] = sum(category["count"] for category in categories)
+        overall["average"] = overall["total"] / overall["count"]
+        overall["minimum"] = min(category["minimum"] for category in categories)
+        overall["maximum"] = max(category["maximum"] for category in categories)
+
+    summary["revenue"] = summary["incomes"]["total"] - summary["expenses"]["total"]
+    return summary
@@ -0,0 +1,428 @@
+"""
+Benchmarks of the API hot paths. They are not collected with the functional tests, run them
+explicitly with:
+
+    pytest family_budget/tests/benchmarks.py -s
+
+The amount of seeded data is controlled with the `BENCHMARK_*` environment variables, e.g.
+`BENCHMARK_TRANSACTIONS=1000000`. They run against the database of the settings in use, SQLite or
+PostgreSQL.
+"""
+import gzip
+import itertools
+import math
+import os
+import statistics
+import time
+from datetime import date, timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+
+from family_budget.cache import budget_cache
+from family_budget.choices import CategoryChoices
+from family_budget.models import Budget, Expense, Income
+from family_budget.renderers import FastJSONRenderer
+from family_budget.tests.helpers import authenticate_client
+
+pytestmark = pytest.mark.django_db
+
+USERS = int(os.environ.get("BENCHMARK_USERS", 50))
+BUDGETS = int(os.environ.get("BENCHMARK_BUDGETS", 200))
+SHARED_BUDGETS = int(os.environ.get("BENCHMARK_SHARED_BUDGETS", 2000))
+SHARES_PER_BUDGET = int(os.environ.get("BENCHMARK_SHARES_PER_BUDGET", 3))
+TRANSACTIONS = int(os.environ.get("BENCHMARK_TRANSACTIONS", 5000))
+SEED_CHUNK_SIZE = 10000
+ROUNDS = int(os.environ.get("BENCHMARK_ROUNDS", 20))
+
+
+def setup_args(setup):
+    result = None if setup is None else setup()
+    return () if result is None else (result,)
+
+
+def measure(func, rounds=ROUNDS, setup=None):
+    """
+    Run `func` `rounds` times and return the timings in milliseconds. `setup` is run, untimed,
+    before every round and its result, if any, is passed to `func`.
+    """
+    timings = []
+    for _ in range(rounds):
+        args = setup_args(setup)
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings, queries=None):
+    timings = sorted(timings)
+    p95 = timings[math.ceil(len(timings) * 0.95) - 1]
+    line = (
+        f"\n{name}: median {statistics.median(timings):.2f} ms, "
+        f"p95 {p95:.2f} ms, max {timings[-1]:.2f} ms, "
+        f"{1000 / statistics.mean(timings):.0f}/s"
+    )
+    if queries is not None:
+        line += f", {queries} queries"
+    print(line)
+
+
+def seed(model, objs):
+    """
+    Create objects in chunks, so millions of them can be seeded without holding them in memory
+    """
+    chunk = []
+    for obj in objs:
+        chunk.append(obj)
+        if len(chunk) == SEED_CHUNK_SIZE:
+            model.objects.bulk_create(chunk)
+            chunk = []
+    model.objects.bulk_create(chunk)
+
+
+@pytest.fixture()
+def dataset(user):
+    """
+    `BENCHMARK_USERS` users and `BENCHMARK_BUDGETS` budgets, each shared with
+    `BENCHMARK_SHARES_PER_BUDGET` users, with `BENCHMARK_TRANSACTIONS` incomes and as many expenses
+    spread over them and over the last years. Returns the user, who owns one budget and has access
+    to a share of the other ones, and one of their budgets.
+    """
+    user_benchmark = user()
+    users = [user_benchmark, *baker.make("User", _quantity=USERS - 1)]
+    budgets = baker.make(
+        "Budget",
+        owner=iter(users * (BUDGETS // len(users) + 1)),
+        _quantity=BUDGETS,
+        _bulk_create=True,
+    )
+    Budget.shared_with.through.objects.bulk_create(
+        Budget.shared_with.through(
+            budget=budget_obj, user=users[(index + share + 1) % len(users)]
+        )
+        for index, budget_obj in enumerate(budgets)
+        for share in range(min(SHARES_PER_BUDGET, len(users) - 1))
+    )
+
+    categories = CategoryChoices.values
+    for model in (Income, Expense):
+        seed(
+            model,
+            (
+                model(
+                    budget=budgets[index % len(budgets)],
+                    amount=index % 1000,
+                    category=categories[index % len(categories)],
+                    date=date(2020, 1, 1) + timedelta(days=index % 1000),
+                )
+                for index in range(TRANSACTIONS)
+            ),
+        )
+    return user_benchmark, budgets[0]
+
+
+def test_benchmark_budget_access_filter(user):
+    user_shared = user()
+    other_users = baker.make("User", _quantity=SHARES_PER_BUDGET - 1)
+    budgets = baker.make("Budget", _quantity=SHARED_BUDGETS, _bulk_create=True)
+    Budget.shared_with.through.objects.bulk_create(
+        Budget.shared_with.through(budget=budget_obj, user=shared_user)
+        for budget_obj in budgets
+        for shared_user in [user_shared, *other_users]
+    )
+
+    def list_page(queryset):
+        def _list_page():
+            queryset.count()
+            list(queryset.order_by("pk")[SHARED_BUDGETS // 2 :][:10])
+
+        return _list_page
+
+    join_filter = Budget.objects.filter(
+        Q(owner=user_shared) | Q(shared_with__in=[user_shared])
+    ).distinct()
+    report("Budgets list, join filter", measure(list_page(join_filter)))
+    report(
+        "Budgets list, accessible_to",
+        measure(list_page(Budget.objects.accessible_to(user_shared))),
+    )
+    assert Budget.objects.accessible_to(user_shared).count() == SHARED_BUDGETS
+
+
+def test_benchmark_compact_incomes_list(client, user):
+    user_owner = user()
+    budget_obj = baker.make("Budget", owner=user_owner)
+    Income.objects.bulk_create(
+        Income(budget=budget_obj, amount=index % 1000) for index in range(TRANSACTIONS)
+    )
+    client_owner = authenticate_client(client, user_owner)
+
+    def list_all(params):
+        def _list_all():
+            url = reverse("incomes-list")
+            params_page = {"pagination": "cursor", "page_size": 1000, **params}
+            rows = 0
+            while url:
+                data = client_owner.get(url, params_page).json()
+                rows += len(data["results"])
+                url, params_page = data["next"], None
+            assert rows == TRANSACTIONS
+
+        return _list_all
+
+    for name, params in (("serializer", {}), ("compact", {"compact": "1"})):
+        timings = measure(list_all(params), rounds=max(ROUNDS // 4, 1))
+        report(f"Incomes list, {name}", timings)
+        print(f"{TRANSACTIONS / statistics.median(timings) * 1000:.0f} rows/s")
+
+
+def test_benchmark_incomes_page_rendering(client, user):
+    """
+    Rendering of the largest `/incomes/` pages with the standard library and with `orjson`, and
+    their size with gzip compression (`GZIP_RESPONSES`)
+    """
+    user_owner = user()
+    budget_obj = baker.make("Budget", owner=user_owner)
+    Income.objects.bulk_create(
+        Income(budget=budget_obj, amount=index % 1000) for index in range(TRANSACTIONS)
+    )
+    client_owner = authenticate_client(client, user_owner)
+    page_size = min(TRANSACTIONS, 1000)
+
+    for name, params in (("serializer", {}), ("compact", {"compact": "1"})):
+        response = client_owner.get(
+            reverse("incomes-list"),
+            {"pagination": "cursor", "page_size": page_size, **params},
+        )
+        data = response.data
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            report(
+                f"Incomes page of {page_size}, {name}, {type(renderer).__name__}",
+                measure(lambda: renderer.render(data)),
+            )
+
+        content = FastJSONRenderer().render(data)
+        timings = measure(lambda: gzip.compress(content, compresslevel=6))
+        report(f"Incomes page of {page_size}, {name}, gzip", timings)
+        print(f"{len(content)} bytes, {len(gzip.compress(content, compresslevel=6))} gzipped")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_persistent_connections(client, user):
+    """
+    Requests per second of the budgets list when every request opens its connection and when
+    connections are reused. Connections of in-memory SQLite test databases are never closed, run
+    it against PostgreSQL.
+    """
+    user_owner = user()
+    baker.make("Budget", owner=user_owner, _quantity=10)
+    client_owner = authenticate_client(client, user_owner)
+    conn_max_age = connection.settings_dict["CONN_MAX_AGE"]
+
+    def list_budgets():
+        # The test client does not close connections, emulate the request handler
+        request_started.send(sender=None)
+        client_owner.get(reverse("budgets-list"))
+        request_finished.send(sender=None)
+
+    try:
+        for name, max_age in (("new connections", 0), ("persistent connections", 60)):
+            connection.settings_dict["CONN_MAX_AGE"] = max_age
+            connection.close()
+            timings = measure(list_budgets, rounds=ROUNDS * 5)
+            report(f"Budgets list, {name}", timings)
+            print(f"{1000 / statistics.mean(timings):.0f} requests/s")
+    finally:
+        connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+
+
+def benchmark(name, func, setup=None):
+    """
+    Report the timings of `func` with the number of queries of its first run, which also warms
+    it up
+    """
+    args = setup_args(setup)
+    with CaptureQueriesContext(connection) as context:
+        func(*args)
+    # Requests reset the queries log, count them before measuring
+    queries = len(context)
+    report(name, measure(func, setup=setup), queries)
+
+
+def test_benchmark_endpoints(client, dataset):
+    """
+    Latency percentiles, throughput and queries per request of the read endpoints, over the
+    seeded dataset. Budgets are served from the budget cache once serialized, they are measured
+    with the cache cleared before every request (cold) and with it filled (warm).
+    """
+    user_benchmark, budget_obj = dataset
+    client_benchmark = authenticate_client(client, user_benchmark)
+    income_obj = Income.objects.filter(budget=budget_obj).first()
+    expense_obj = Expense.objects.filter(budget=budget_obj).first()
+    budget_kwargs = {"pk": budget_obj.pk}
+
+    endpoints = [
+        ("budgets-list", {}, {}),
+        ("budgets-list", {}, {"pagination": "cursor"}),
+        ("budgets-list", {}, {"nested_limit": 10}),
+        ("budgets-detail", budget_kwargs, {}),
+        ("budgets-summary", budget_kwargs, {}),
+        ("budgets-monthly", budget_kwargs, {}),
+        ("budgets-export", budget_kwargs, {"format": "csv"}),
+        ("incomes-list", {}, {}),
+        ("incomes-list", {}, {"pagination": "cursor", "compact": "1"}),
+        ("incomes-list", {}, {"budget": budget_obj.pk, "with_totals": "1"}),
+        ("incomes-detail", {"pk": income_obj.pk}, {}),
+        ("incomes-rollup", {}, {"period": "month"}),
+        ("expenses-list", {}, {}),
+        ("expenses-detail", {"pk": expense_obj.pk}, {}),
+        ("expenses-rollup", {}, {"budget": budget_obj.pk, "period": "week"}),
+        ("summary", {}, {}),
+        ("transactions", {}, {}),
+        ("transactions", {}, {"budget": budget_obj.pk}),
+        ("sync", {}, {}),
+        ("async-budgets-list", {}, {}),
+        ("async-incomes-list", {}, {}),
+    ]
+    cached = ("budgets-list", "budgets-detail", "budgets-summary")
+
+    for name, kwargs, params in endpoints:
+        url = reverse(name, kwargs=kwargs)
+
+        def get(url=url, params=params):
+            response = client_benchmark.get(url, params)
+            assert response.status_code == 200, response
+            if response.streaming:
+                b"".join(response.streaming_content)
+
+        if name in cached:
+            benchmark(f"GET {name} {params or ''} (cold)", get, budget_cache.cache.clear)
+            benchmark(f"GET {name} {params or ''} (warm)", get)
+        else:
+            benchmark(f"GET {name} {params or ''}", get)
+
+
+def test_benchmark_write_endpoints(client, dataset):
+    """
+    Latency percentiles, throughput and queries per request of the write endpoints, over the
+    seeded dataset
+    """
+    user_benchmark, budget_obj = dataset
+    client_benchmark = authenticate_client(client, user_benchmark)
+    names = (f"benchmark-{index}" for index in itertools.count())
+
+    def request(method, url, data=None, expected=200, **kwargs):
+        def _request(setup_data=None):
+            response = getattr(client_benchmark, method)(
+                url, setup_data or data, format=kwargs.get("format", "json")
+            )
+            assert response.status_code == expected, response.data
+            return response
+
+        return _request
+
+    for prefix, model in (("incomes", Income), ("expenses", Expense)):
+        obj = model.objects.filter(budget=budget_obj).first()
+        detail_url = reverse(f"{prefix}-detail", kwargs={"pk": obj.pk})
+        item = {"amount": "10.00", "category": "OTHER", "budget": budget_obj.pk}
+        benchmark(
+            f"POST {prefix}-list",
+            request("post", reverse(f"{prefix}-list"), item, expected=201),
+        )
+        benchmark(f"PUT {prefix}-detail", request("put", detail_url, item))
+        benchmark(
+            f"PATCH {prefix}-detail", request("patch", detail_url, {"amount": "11.00"})
+        )
+
+        def create_obj(model=model):
+            return model.objects.create(budget=budget_obj, amount=1)
+
+        def delete_obj(obj, prefix=prefix):
+            url = reverse(f"{prefix}-detail", kwargs={"pk": obj.pk})
+            assert client_benchmark.delete(url).status_code == 204
+
+        benchmark(f"DELETE {prefix}-detail", delete_obj, create_obj)
+
+        bulk_url = reverse(f"{prefix}-bulk")
+        benchmark(
+            f"POST {prefix}-bulk (100 items)",
+            request("post", bulk_url, [item] * 100, expected=201),
+        )
+        ids = list(
+            model.objects.filter(budget=budget_obj).values_list("pk", flat=True)[:100]
+        )
+        benchmark(
+            f"PATCH {prefix}-bulk (100 items)",
+            request("patch", bulk_url, [{"id": pk, "amount": "12.00"} for pk in ids]),
+        )
+
+        def create_objs(model=model):
+            objs = model.objects.bulk_create(
+                model(budget=budget_obj, amount=1) for _ in range(100)
+            )
+            return {"ids": [obj.pk for obj in objs]}
+
+        benchmark(
+            f"DELETE {prefix}-bulk (100 items)",
+            request("delete", bulk_url, expected=204),
+            create_objs,
+        )
+
+    benchmark(
+        "POST budgets-list",
+        request(
+            "post",
+            reverse("budgets-list"),
+            {
+                "name": "benchmark",
+                "incomes": [{"amount": "10.00", "category": "WORK"}] * 10,
+                "expenses": [{"amount": "5.00", "category": "FOOD"}] * 10,
+            },
+            expected=201,
+        ),
+    )
+    # The updated budget is returned with all its incomes and expenses
+    budget_url = reverse("budgets-detail", kwargs={"pk": budget_obj.pk})
+    benchmark("PATCH budgets-detail", request("patch", budget_url, {"name": "renamed"}))
+
+    def create_budget():
+        return Budget.objects.create(name="benchmark", owner=user_benchmark)
+
+    def delete_budget(budget):
+        url = reverse("budgets-detail", kwargs={"pk": budget.pk})
+        assert client_benchmark.delete(url).status_code == 204
+
+    benchmark("DELETE budgets-detail", delete_budget, create_budget)
+    benchmark(
+        "POST budgets-share",
+        request(
+            "post",
+            reverse("budgets-share", kwargs={"pk": budget_obj.pk}),
+            expected=204,
+        ),
+        lambda: {"user": baker.make("User").username},
+    )
+
+    csv_content = "type,amount,category\n" + "income,1.00,WORK\nexpense,2.00,FOOD\n" * 500
+    benchmark(
+        "POST budgets-import-transactions (1000 rows)",
+        request(
+            "post",
+            reverse("budgets-import-transactions", kwargs={"pk": budget_obj.pk}),
+            format="multipart",
+        ),
+        lambda: {"file": SimpleUploadedFile("import.csv", csv_content.encode())},
+    )
+    benchmark(
+        "POST register",
+        request("post", reverse("register"), expected=201),
+        lambda: {"username": next(names), "password": "benchmark-password"},
+    )
@@ -3,12 +3,21 @@ from pathlib import Path
 
 import pytest
 from django.conf import settings
+from django.core.cache import caches
 from model_bakery import baker
 from rest_framework.test import APIClient
 
 base_dir = settings.BASE_DIR / Path("family_budget/tests/resources")
 
 
+@pytest.fixture(autouse=True)
+def clear_budget_cache():
+    """
+    Budgets of different tests get the same ids and versions, and so the same cache keys
+    """
+    caches[settings.BUDGET_CACHE_ALIAS].clear()
+
+
 @pytest.fixture()
 def budget():
     def _budget(**kwargs):
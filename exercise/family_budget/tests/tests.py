@@ -1,11 +1,35 @@
+import json
+from datetime import date, datetime, timezone
 from decimal import Decimal
+from io import BytesIO, StringIO
 
 import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.models import Max
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
 
-from family_budget.models import Budget, Expense, Income
+from family_budget.access import BudgetAccess
+from family_budget.cache import budget_cache
+from family_budget.choices import CategoryChoices
+from family_budget.metrics import RequestMetricsMiddleware
+from family_budget.models import (
+    Budget,
+    BudgetChange,
+    BudgetPeriodTotal,
+    Expense,
+    Income,
+)
+from family_budget.renderers import FastJSONParser, FastJSONRenderer
 from family_budget.tests.helpers import (
     authenticate_client,
     compare_budgets,
@@ -36,10 +60,21 @@ def test_create_income(client, user, budget, create_income_data):
     budget_1 = budget(owner=user_owner, pk=1)
     client_owner = authenticate_client(client, user_owner)
     assert Income.objects.count() == 0
-    response = client_owner.post(reverse("incomes-list"), data=create_income_data)
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.post(reverse("incomes-list"), data=create_income_data)
     assert response.status_code == status.HTTP_201_CREATED
     assert Income.objects.count() == 1
     compare_incomes_expenses(Income, create_income_data, budget_1)
+    # The totals and the version of the budget are updated together
+    budget_updates = [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith('UPDATE "family_budget_budget"')
+    ]
+    assert len(budget_updates) == 1
+    assert '"version"' in budget_updates[0]
+    budget_1.refresh_from_db()
+    assert BudgetChange.objects.get(type="income").version == budget_1.version
 
 
 def test_create_expense(client, user, budget, create_expense_data):
@@ -188,3 +223,1134 @@ def test_budget_model_revenue(budget, income, expense):
     income(amount=10, budget=budget_1)
     expense(amount=1, budget=budget_1)
     assert budget_1.revenue == 109
+
+
+def test_budget_queryset_with_revenue(budget, income, expense):
+    budget_1 = budget()
+    budget_2 = budget()
+    income(amount=100, budget=budget_1)
+    income(amount=10, budget=budget_1)
+    expense(amount=1, budget=budget_1)
+    expense(amount=5, budget=budget_2)
+
+    budgets = Budget.objects.with_revenue().order_by("pk")
+    assert [b.annotated_revenue for b in budgets] == [109, -5]
+    assert [b.revenue for b in budgets] == [109, -5]
+
+
+def test_budget_totals_are_maintained_on_writes(budget, income, expense):
+    budget_1 = budget()
+    budget_2 = budget()
+    income_1 = income(amount=100, budget=budget_1)
+    income(amount=10, budget=budget_1)
+    expense(amount=1, budget=budget_1)
+
+    income_1.amount = 50
+    income_1.save()
+    income_1.budget = budget_2
+    income_1.save()
+    Expense.objects.filter(budget=budget_1).delete()
+
+    budget_1.name = "renamed"
+    budget_1.save()
+
+    budget_1.refresh_from_db()
+    budget_2.refresh_from_db()
+    assert (budget_1.income_total, budget_1.income_count) == (10, 1)
+    assert (budget_1.expense_total, budget_1.expense_count) == (0, 0)
+    assert (budget_2.income_total, budget_2.income_count) == (50, 1)
+    assert budget_1.revenue == 10
+
+    income_1.delete()
+    budget_2.refresh_from_db()
+    assert (budget_2.income_total, budget_2.income_count) == (0, 0)
+
+
+def test_budget_totals_through_api(client, user, budget, income, create_income_data):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner, pk=1)
+    client_owner = authenticate_client(client, user_owner)
+
+    client_owner.post(reverse("incomes-list"), data=create_income_data)
+    income_1 = Income.objects.get()
+    budget_1.refresh_from_db()
+    assert budget_1.income_total == Decimal(create_income_data["amount"])
+
+    client_owner.delete(reverse("incomes-detail", kwargs={"pk": income_1.pk}))
+    budget_1.refresh_from_db()
+    assert (budget_1.income_total, budget_1.income_count) == (0, 0)
+
+
+def test_rebuild_budget_totals_command(budget, income, expense):
+    budget_1 = budget()
+    income(amount=100, budget=budget_1)
+    expense(amount=1, budget=budget_1)
+    Budget.objects.update(income_total=0, expense_count=5)
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_budget_totals", "--check", stdout=StringIO())
+    call_command("rebuild_budget_totals", stdout=StringIO())
+    call_command("rebuild_budget_totals", "--check", stdout=StringIO())
+
+    budget_1.refresh_from_db()
+    assert (budget_1.income_total, budget_1.income_count) == (100, 1)
+    assert (budget_1.expense_total, budget_1.expense_count) == (1, 1)
+
+
+def test_list_budgets_query_count_is_constant(client, user, budget, income, expense):
+    user_owner = user()
+    client_owner = authenticate_client(client, user_owner)
+
+    def count_list_queries():
+        with CaptureQueriesContext(connection) as context:
+            response = client_owner.get(reverse("budgets-list"))
+        assert response.status_code == status.HTTP_200_OK
+        return len(context)
+
+    budget_1 = budget(owner=user_owner)
+    income(budget=budget_1)
+    expense(budget=budget_1)
+    queries_for_one_budget = count_list_queries()
+
+    for _ in range(3):
+        budget_n = budget(owner=user_owner, shared_with=[user()])
+        income(budget=budget_n, _quantity=3)
+        expense(budget=budget_n, _quantity=3)
+    assert count_list_queries() == queries_for_one_budget
+
+
+def test_retrieve_budget_query_count_is_constant(client, user, budget, income, expense):
+    user_owner = user()
+    client_owner = authenticate_client(client, user_owner)
+    budget_1 = budget(owner=user_owner)
+    url = reverse("budgets-detail", kwargs={"pk": budget_1.pk})
+
+    income(budget=budget_1)
+    with CaptureQueriesContext(connection) as context:
+        client_owner.get(url)
+    queries_for_one_income = len(context)
+
+    income(budget=budget_1, _quantity=5)
+    expense(budget=budget_1, _quantity=5)
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["incomes"]) == 6
+    assert len(context) == queries_for_one_income
+
+
+def test_retrieve_income_as_owner_checks_access_without_query(client, user, budget, income):
+    user_owner = user()
+    income_1 = income(budget=budget(owner=user_owner))
+    client_owner = authenticate_client(client, user_owner)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.get(reverse("incomes-detail", kwargs={"pk": income_1.pk}))
+    assert response.status_code == status.HTTP_200_OK
+    assert not [query for query in context.captured_queries if "EXISTS" in query["sql"]]
+
+
+def test_create_budget_inserts_items_in_batches(
+    client, user, settings, create_budget_data
+):
+    settings.BULK_CREATE_BATCH_SIZE = 2
+    create_budget_data["incomes"] *= 5
+    client_owner = authenticate_client(client, user())
+
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.post(
+            reverse("budgets-list"), format="json", data=create_budget_data
+        )
+    assert response.status_code == status.HTTP_201_CREATED
+    income_inserts = [
+        query
+        for query in context.captured_queries
+        if query["sql"].startswith('INSERT INTO "family_budget_income"')
+    ]
+    assert len(income_inserts) == 3
+
+    budget_1 = Budget.objects.get()
+    assert budget_1.incomes.count() == 5
+    assert (budget_1.income_total, budget_1.income_count) == (500, 5)
+    assert (budget_1.expense_total, budget_1.expense_count) == (5, 1)
+
+
+def test_create_budget_rolls_back_on_failure(
+    client, user, monkeypatch, create_budget_data
+):
+    def failing_bulk_create(*args, **kwargs):
+        raise DatabaseError()
+
+    monkeypatch.setattr(Expense.objects, "bulk_create", failing_bulk_create)
+    client_owner = authenticate_client(client, user())
+
+    with pytest.raises(DatabaseError):
+        client_owner.post(reverse("budgets-list"), format="json", data=create_budget_data)
+    assert Budget.objects.count() == 0
+    assert Income.objects.count() == 0
+
+
+def test_bulk_create_incomes(client, user, budget):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    budget_2 = budget(shared_with=[user_owner])
+    client_owner = authenticate_client(client, user_owner)
+    data = [
+        {"amount": "10.00", "category": "WORK", "budget": budget_1.pk},
+        {"amount": "20.00", "category": "OTHER", "budget": budget_2.pk},
+        {"amount": "30.00", "budget": budget_1.pk},
+    ]
+
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.post(reverse("incomes-bulk"), format="json", data=data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert len(response.data) == 3
+    assert Income.objects.count() == 3
+    statements = [query["sql"].split()[:3] for query in context.captured_queries]
+    # The accessible budgets, then the new versions of the changed budgets for the change log
+    assert [statement[0] for statement in statements].count("SELECT") == 2
+    assert statements.count(["INSERT", "INTO", '"family_budget_income"']) == 1
+
+    budget_1.refresh_from_db()
+    assert (budget_1.income_total, budget_1.income_count) == (40, 2)
+
+
+def test_bulk_create_returns_per_item_errors(client, user, budget):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    budget_unshared = budget()
+    client_owner = authenticate_client(client, user_owner)
+    data = [
+        {"amount": "10.00", "budget": budget_1.pk},
+        {"amount": "10000.00", "budget": budget_1.pk},
+        {"amount": "1.00", "category": "UNKNOWN", "budget": budget_1.pk},
+    ]
+
+    response = client_owner.post(reverse("expenses-bulk"), format="json", data=data)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data[0] == {}
+    assert "amount" in response.data[1]
+    assert "category" in response.data[2]
+
+    data = [
+        {"amount": "10.00", "budget": budget_1.pk},
+        {"amount": "10.00", "budget": budget_unshared.pk},
+    ]
+    response = client_owner.post(reverse("expenses-bulk"), format="json", data=data)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data[0] == {}
+    assert "budget" in response.data[1]
+    assert Expense.objects.count() == 0
+
+
+def test_bulk_update_and_delete_expenses(client, user, budget, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    budget_2 = budget(owner=user_owner)
+    expense_1, expense_2 = expense(budget=budget_1, amount=1, _quantity=2)
+    expense_unshared = expense(amount=1)
+    client_owner = authenticate_client(client, user_owner)
+
+    data = [
+        {"id": expense_1.pk, "amount": "5.00"},
+        {"id": expense_2.pk, "budget": budget_2.pk, "category": "FOOD"},
+    ]
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.patch(reverse("expenses-bulk"), format="json", data=data)
+    assert response.status_code == status.HTTP_200_OK
+    # Only the fields sent for an item are written
+    updates = [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith('UPDATE "family_budget_expense"')
+    ]
+    assert len(updates) == 2
+    assert not any('"amount"' in sql and '"category"' in sql for sql in updates)
+    expense_1.refresh_from_db()
+    expense_2.refresh_from_db()
+    assert expense_1.amount == 5
+    assert (expense_2.budget, expense_2.category) == (budget_2, "FOOD")
+    budget_1.refresh_from_db()
+    budget_2.refresh_from_db()
+    assert (budget_1.expense_total, budget_1.expense_count) == (5, 1)
+    assert (budget_2.expense_total, budget_2.expense_count) == (1, 1)
+
+    data = [{"id": expense_1.pk, "amount": "6.00"}, {"id": expense_unshared.pk}]
+    response = client_owner.patch(reverse("expenses-bulk"), format="json", data=data)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data[0] == {}
+    assert "id" in response.data[1]
+
+    response = client_owner.delete(
+        reverse("expenses-bulk"),
+        format="json",
+        data={"ids": [expense_1.pk, expense_unshared.pk]},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert Expense.objects.count() == 3
+
+    response = client_owner.delete(
+        reverse("expenses-bulk"),
+        format="json",
+        data={"ids": [expense_1.pk, expense_2.pk]},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert list(Expense.objects.all()) == [expense_unshared]
+    budget_1.refresh_from_db()
+    assert (budget_1.expense_total, budget_1.expense_count) == (0, 0)
+
+
+def test_export_budget_transactions(client, user, budget, income, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    income_1 = income(
+        budget=budget_1, amount=100, category="WORK", date=date(2022, 7, 1)
+    )
+    expense_1 = expense(
+        budget=budget_1, amount="5.50", category="FOOD", date=date(2022, 7, 2)
+    )
+    client_owner = authenticate_client(client, user_owner)
+    url = reverse("budgets-export", kwargs={"pk": budget_1.pk})
+
+    response = client_owner.get(url, {"format": "csv"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv"
+    assert b"".join(response.streaming_content).decode().splitlines() == [
+        "type,id,amount,category,date",
+        f"income,{income_1.pk},100.00,WORK,2022-07-01",
+        f"expense,{expense_1.pk},5.50,FOOD,2022-07-02",
+    ]
+
+    response = client_owner.get(url, {"format": "ndjson"})
+    assert response.status_code == status.HTTP_200_OK
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {
+            "type": "income",
+            "id": income_1.pk,
+            "amount": "100.00",
+            "category": "WORK",
+            "date": "2022-07-01",
+        },
+        {
+            "type": "expense",
+            "id": expense_1.pk,
+            "amount": "5.50",
+            "category": "FOOD",
+            "date": "2022-07-02",
+        },
+    ]
+
+    client_unshared = authenticate_client(client, user())
+    response = client_unshared.get(url, {"format": "csv"})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+IMPORT_CSV = (
+    "type,amount,category,date\n"
+    "income,100.00,WORK,2022-07-01\n"
+    "expense,5.50,FOOD,\n"
+    "expense,10000.00,FOOD,\n"
+    "income,1.00,UNKNOWN,\n"
+    "transfer,1.00,,\n"
+    "expense,2.00,,2022-07-32\n"
+    "expense,2.00,,\n"
+)
+
+
+def test_import_transactions(client, user, budget, settings):
+    settings.IMPORT_CHUNK_SIZE = 1
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    client_owner = authenticate_client(client, user_owner)
+
+    response = client_owner.post(
+        reverse("budgets-import-transactions", kwargs={"pk": budget_1.pk}),
+        data={"file": SimpleUploadedFile("import.csv", IMPORT_CSV.encode())},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["created"] == {"income": 1, "expense": 2}
+    assert response.data["rejected_count"] == 4
+    assert [rejected["line"] for rejected in response.data["rejected"]] == [4, 5, 6, 7]
+    assert list(response.data["rejected"][0]["errors"]) == ["amount"]
+    assert list(response.data["rejected"][1]["errors"]) == ["category"]
+    assert list(response.data["rejected"][2]["errors"]) == ["type"]
+    assert list(response.data["rejected"][3]["errors"]) == ["date"]
+    assert budget_1.incomes.get().date == date(2022, 7, 1)
+
+    assert budget_1.expenses.filter(category=CategoryChoices.OTHER).count() == 1
+    budget_1.refresh_from_db()
+    assert (budget_1.income_total, budget_1.income_count) == (100, 1)
+    assert (budget_1.expense_total, budget_1.expense_count) == (Decimal("7.50"), 2)
+
+    response = client_owner.post(
+        reverse("budgets-import-transactions", kwargs={"pk": budget_1.pk}),
+        data={"file": SimpleUploadedFile("import.csv", b"amount\n1.00\n")},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_import_transactions_is_atomic(client, user, budget, settings):
+    settings.IMPORT_CHUNK_SIZE = 10
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    client_owner = authenticate_client(client, user_owner)
+    # The file is decoded in blocks, the invalid byte is read after chunks have been loaded
+    content = b"type,amount\n" + b"income,1.00\n" * 2000 + b"income,\xff\n"
+
+    response = client_owner.post(
+        reverse("budgets-import-transactions", kwargs={"pk": budget_1.pk}),
+        data={"file": SimpleUploadedFile("import.csv", content)},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert budget_1.incomes.count() == 0
+    budget_1.refresh_from_db()
+    assert budget_1.income_count == 0
+
+
+def test_import_transactions_command(budget, tmp_path):
+    budget_1 = budget()
+    path = tmp_path / "import.csv"
+    path.write_text(IMPORT_CSV)
+    stderr = StringIO()
+
+    call_command(
+        "import_transactions", budget_1.pk, str(path), stdout=StringIO(), stderr=stderr
+    )
+    assert budget_1.incomes.count() == 1
+    assert budget_1.expenses.count() == 2
+    assert len(stderr.getvalue().splitlines()) == 4
+
+
+def test_list_incomes_with_cursor_pagination(client, user, budget, income):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    incomes = income(budget=budget_1, _quantity=5)
+    client_owner = authenticate_client(client, user_owner)
+
+    response = client_owner.get(
+        reverse("incomes-list"), {"pagination": "cursor", "page_size": 2}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "count" not in response.data
+    assert response.data["previous"] is None
+
+    ids = [item["id"] for item in response.data["results"]]
+    while response.data["next"]:
+        response = client_owner.get(response.data["next"])
+        ids += [item["id"] for item in response.data["results"]]
+    assert ids == [obj.pk for obj in incomes]
+
+
+def test_cursor_pagination_max_page_size(client, user, budget, income, settings):
+    settings.CURSOR_PAGINATION_MAX_PAGE_SIZE = 2
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    income(budget=budget_1, _quantity=3)
+    client_owner = authenticate_client(client, user_owner)
+
+    response = client_owner.get(
+        reverse("incomes-list"), {"pagination": "cursor", "page_size": 10}
+    )
+    assert len(response.data["results"]) == 2
+    response = client_owner.get(reverse("transactions"), {"page_size": 10})
+    assert len(response.data["results"]) == 2
+
+
+def test_list_budgets_shared_with_many_users_once(client, user, budget, income):
+    user_owner = user()
+    user_shared = user()
+    budget_1 = budget(owner=user_owner, shared_with=[user_shared, user()])
+    income(budget=budget_1)
+    budget(owner=user(), shared_with=[user_shared, user()])
+
+    client_owner = authenticate_client(client, user_owner)
+    response = client_owner.get(reverse("budgets-list"))
+    assert response.data["count"] == 1
+    response = client_owner.get(reverse("incomes-list"))
+    assert response.data["count"] == 1
+
+    client_shared = authenticate_client(client, user_shared)
+    response = client_shared.get(reverse("budgets-list"))
+    assert response.data["count"] == 2
+
+
+def test_budget_access_resolver(django_assert_num_queries, user, budget):
+    user_shared = user()
+    budget_owned = budget(owner=user_shared)
+    budget_shared = budget(shared_with=[user_shared, user()])
+    budget_unshared = budget()
+    access = BudgetAccess(user_shared)
+
+    with django_assert_num_queries(0):
+        assert access.has_access(budget_owned)
+    with django_assert_num_queries(1):
+        assert access.has_access(budget_shared)
+        assert access.has_access(budget_shared.pk)
+    with django_assert_num_queries(1):
+        assert not access.has_access(budget_unshared.pk)
+
+    with django_assert_num_queries(1):
+        assert access.accessible(
+            [budget_owned.pk, budget_shared.pk, budget_unshared.pk]
+        ) == {budget_owned.pk, budget_shared.pk}
+        assert not access.has_access(budget_unshared.pk)
+
+
+def test_budget_cache(client, user, budget, income, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    income(budget=budget_1, amount=10)
+    client_owner = authenticate_client(client, user_owner)
+    url = reverse("budgets-detail", kwargs={"pk": budget_1.pk})
+    stats = budget_cache.stats()
+
+    with CaptureQueriesContext(connection) as context_miss:
+        response_miss = client_owner.get(url)
+    with CaptureQueriesContext(connection) as context_hit:
+        response_hit = client_owner.get(url)
+    assert response_hit.data == response_miss.data
+    assert len(context_hit) < len(context_miss)
+    assert budget_cache.stats()["hits"] == stats["hits"] + 1
+    assert budget_cache.stats()["misses"] == stats["misses"] + 1
+
+    # writes to incomes, expenses and the budget invalidate the cached payload
+    expense(budget=budget_1, amount=1)
+    assert len(client_owner.get(url).data["expenses"]) == 1
+    Income.objects.filter(budget=budget_1).delete()
+    assert client_owner.get(url).data["incomes"] == []
+    budget_1.name = "renamed"
+    budget_1.save()
+    assert client_owner.get(url).data["name"] == "renamed"
+    response_list = client_owner.get(reverse("budgets-list"))
+    assert response_list.data["results"][0]["revenue"] == -1
+
+    # cached budgets are still served only to users having access to them
+    client_unshared = authenticate_client(client, user())
+    assert client_unshared.get(url).status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_budget_cache_stats(client, user):
+    response = authenticate_client(client, user()).get(reverse("budgets-cache-stats"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = authenticate_client(client, user(is_staff=True)).get(
+        reverse("budgets-cache-stats")
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.data) == {"hits", "misses", "hit_ratio"}
+
+
+def test_budget_summary(client, user, budget, income, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    budget_2 = budget(shared_with=[user_owner])
+    income(budget=budget_1, amount=100, category="WORK")
+    income(budget=budget_1, amount=50, category="WORK")
+    income(budget=budget_2, amount=10, category="OTHER")
+    expense(budget=budget_1, amount=1, category="FOOD")
+    expense(budget=budget(), amount=1000, category="FOOD")
+    client_owner = authenticate_client(client, user_owner)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.get(
+            reverse("budgets-summary", kwargs={"pk": budget_1.pk})
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(context) == 2
+    assert response.data["revenue"] == "149.00"
+    assert response.data["incomes"]["categories"] == {
+        "WORK": {
+            "total": "150.00",
+            "count": 2,
+            "average": "75.00",
+            "minimum": "50.00",
+            "maximum": "100.00",
+        }
+    }
+    assert response.data["expenses"]["count"] == 1
+
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.get(reverse("summary"))
+    assert response.status_code == status.HTTP_200_OK
+    assert len(context) == 1
+    assert response.data["incomes"]["total"] == "160.00"
+    assert set(response.data["incomes"]["categories"]) == {"WORK", "OTHER"}
+    assert response.data["incomes"]["minimum"] == "10.00"
+    assert response.data["expenses"]["total"] == "1.00"
+    assert response.data["revenue"] == "159.00"
+
+
+def test_filter_and_rollup_expenses_by_date(client, user, budget, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    expense(budget=budget_1, amount=1, date=date(2022, 6, 30))
+    expense(budget=budget_1, amount=2, date=date(2022, 7, 1))
+    expense(budget=budget_1, amount=3, date=date(2022, 7, 4))
+    expense(budget=budget_1, amount=4, date=date(2022, 8, 1))
+    expense(amount=100, date=date(2022, 7, 1))
+    client_owner = authenticate_client(client, user_owner)
+
+    response = client_owner.get(
+        reverse("expenses-list"),
+        {"date_after": "2022-07-01", "date_before": "2022-07-31"},
+    )
+    assert response.data["count"] == 2
+    assert {item["date"] for item in response.data["results"]} == {
+        "2022-07-01",
+        "2022-07-04",
+    }
+
+    response = client_owner.get(reverse("expenses-rollup"), {"period": "month"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == [
+        {"period": "2022-06-01", "total": "1.00", "count": 1},
+        {"period": "2022-07-01", "total": "5.00", "count": 2},
+        {"period": "2022-08-01", "total": "4.00", "count": 1},
+    ]
+
+    response = client_owner.get(
+        reverse("expenses-rollup"),
+        {"period": "week", "budget": budget_1.pk, "date_after": "2022-07-01"},
+    )
+    assert response.data == [
+        {"period": "2022-06-27", "total": "2.00", "count": 1},
+        {"period": "2022-07-04", "total": "3.00", "count": 1},
+        {"period": "2022-08-01", "total": "4.00", "count": 1},
+    ]
+
+    response = client_owner.get(reverse("expenses-rollup"), {"period": "year"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def period_totals(budget):
+    return {
+        (row.period, row.category): (
+            row.income_total,
+            row.income_count,
+            row.expense_total,
+            row.expense_count,
+        )
+        for row in BudgetPeriodTotal.objects.filter(budget=budget)
+        if row.income_count or row.expense_count
+    }
+
+
+def test_period_totals_are_maintained_on_writes(budget, income, expense):
+    budget_1 = budget()
+    food, work = CategoryChoices.FOOD, CategoryChoices.WORK
+    income_1 = income(budget=budget_1, amount=10, category=work, date=date(2022, 6, 3))
+    income(budget=budget_1, amount=5, category=work, date=date(2022, 6, 30))
+    expense_1 = expense(budget=budget_1, amount=2, category=food, date=date(2022, 6, 5))
+    assert period_totals(budget_1) == {
+        (date(2022, 6, 1), work): (15, 2, 0, 0),
+        (date(2022, 6, 1), food): (0, 0, 2, 1),
+    }
+
+    income_1.date = date(2022, 7, 1)
+    with CaptureQueriesContext(connection) as context:
+        income_1.save()
+    # The budget row is locked before its period totals even though its total is unchanged
+    tables = [
+        table
+        for query in context.captured_queries
+        for table in ("family_budget_budget", "family_budget_budgetperiodtotal")
+        if query["sql"].startswith(f'UPDATE "{table}"')
+        or query["sql"].startswith(f'INSERT INTO "{table}"')
+    ]
+    assert tables and tables[0] == "family_budget_budget"
+    Expense.objects.bulk_update(
+        [Expense(pk=expense_1.pk, amount=3, category=work)], ["amount", "category"]
+    )
+    assert period_totals(budget_1) == {
+        (date(2022, 6, 1), work): (5, 1, 3, 1),
+        (date(2022, 7, 1), work): (10, 1, 0, 0),
+    }
+
+    Income.objects.filter(date__month=6).delete()
+    expense_1.refresh_from_db()
+    expense_1.delete()
+    assert period_totals(budget_1) == {(date(2022, 7, 1), work): (10, 1, 0, 0)}
+
+
+def test_backfill_period_totals_command(client, user, budget, income, expense):
+    user_owner = user()
+    budget_1, budget_2 = budget(owner=user_owner), budget()
+    income(budget=budget_1, amount=10, category=CategoryChoices.WORK, date=date(2022, 6, 3))
+    expense(budget=budget_1, amount=2, category=CategoryChoices.FOOD, date=date(2022, 7, 5))
+    expense(budget=budget_2, amount=1, date=date(2022, 7, 5))
+    BudgetPeriodTotal.objects.all().delete()
+
+    call_command("backfill_period_totals", "--chunk-size", "1", stdout=StringIO())
+    assert period_totals(budget_1) == {
+        (date(2022, 6, 1), CategoryChoices.WORK): (10, 1, 0, 0),
+        (date(2022, 7, 1), CategoryChoices.FOOD): (0, 0, 2, 1),
+    }
+    assert period_totals(budget_2) == {
+        (date(2022, 7, 1), CategoryChoices.OTHER): (0, 0, 1, 1)
+    }
+
+    client_owner = authenticate_client(client, user_owner)
+    response = client_owner.get(
+        reverse("budgets-monthly", kwargs={"pk": budget_1.pk}),
+        {"period_after": "2022-07-01"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == [
+        {
+            "period": "2022-07-01",
+            "category": CategoryChoices.FOOD,
+            "income_total": "0.00",
+            "income_count": 0,
+            "expense_total": "2.00",
+            "expense_count": 1,
+        }
+    ]
+    response = client_owner.get(reverse("budgets-monthly", kwargs={"pk": budget_2.pk}))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_list_incomes_compact(client, user, budget, income):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    income_1 = income(
+        budget=budget_1, amount=10, category=CategoryChoices.WORK, date=date(2022, 6, 3)
+    )
+    income_2 = income(budget=budget_1, amount=Decimal("2.50"), date=date(2022, 6, 4))
+    income()
+    client_owner = authenticate_client(client, user_owner)
+
+    response = client_owner.get(reverse("incomes-list"), {"compact": "1"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 2
+    assert response.json()["results"][0] == {
+        "id": income_1.pk,
+        "budget": budget_1.pk,
+        "amount": "10.00",
+        "category": "WORK",
+        "date": "2022-06-03",
+    }
+
+    response = client_owner.get(
+        reverse("incomes-list"),
+        {"fields": "id,amount", "pagination": "cursor", "page_size": 1},
+    )
+    assert response.json()["results"] == [{"id": income_1.pk, "amount": "10.00"}]
+    response = client_owner.get(response.data["next"])
+    assert response.json()["results"] == [{"id": income_2.pk, "amount": "2.50"}]
+
+    response = client_owner.get(reverse("incomes-list"), {"fields": "id,owner"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_list_expenses_with_totals(client, user, budget, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    expense(budget=budget_1, amount=10, category=CategoryChoices.FOOD, _quantity=12)
+    expense(budget=budget_1, amount=Decimal("0.50"), category=CategoryChoices.FOOD)
+    expense(budget=budget_1, amount=7, category=CategoryChoices.WORK)
+    expense(amount=100, category=CategoryChoices.FOOD)
+    client_owner = authenticate_client(client, user_owner)
+    params = {"budget": budget_1.pk, "category": "FOOD", "with_totals": "1"}
+
+    with CaptureQueriesContext(connection) as context:
+        response = client_owner.get(reverse("expenses-list"), params)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 13
+    assert len(response.data["results"]) == 10
+    assert response.data["totals"] == {"total": "120.50", "count": 13}
+    aggregate_queries = [
+        query for query in context.captured_queries if "SUM(" in query["sql"]
+    ]
+    assert len(aggregate_queries) == 1
+    assert "COUNT(" in aggregate_queries[0]["sql"]
+
+    response = client_owner.get(
+        reverse("expenses-list"), {**params, "pagination": "cursor", "compact": "1"}
+    )
+    assert response.data["totals"] == {"total": "120.50", "count": 13}
+
+    response = client_owner.get(
+        reverse("expenses-list"), {**params, "category": "OTHER"}
+    )
+    assert response.data["totals"] == {"total": "0.00", "count": 0}
+    response = client_owner.get(reverse("expenses-list"))
+    assert "totals" not in response.data
+
+
+def test_async_views(client, user, budget, income, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    income_1 = income(budget=budget_1, amount=10)
+    expense(budget=budget_1, amount=4)
+    budget_2 = budget()
+    income_2 = income(budget=budget_2)
+
+    response = client.get(reverse("async-budgets-list"))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    client_owner = authenticate_client(client, user_owner)
+    for name, kwargs in (
+        ("budgets-list", {}),
+        ("budgets-detail", {"pk": budget_1.pk}),
+        ("incomes-list", {}),
+        ("incomes-detail", {"pk": income_1.pk}),
+    ):
+        sync_response = client_owner.get(reverse(name, kwargs=kwargs))
+        response = client_owner.get(reverse(f"async-{name}", kwargs=kwargs))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == sync_response.json()
+
+    response = client_owner.get(
+        reverse("async-expenses-list"), {"budget": budget_1.pk, "with_totals": "1"}
+    )
+    assert response.json()["totals"] == {"total": "4.00", "count": 1}
+    response = client_owner.get(reverse("async-expenses-list"), {"date_after": "x"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = client_owner.get(
+        reverse("async-incomes-detail", kwargs={"pk": income_2.pk})
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = client_owner.get(reverse("async-incomes-detail", kwargs={"pk": 0}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_request_metrics(settings, caplog, user, budget, income):
+    settings.REQUEST_METRICS = True
+    settings.REQUEST_METRICS_QUERY_BUDGET = 1
+    user_owner = user()
+    income(budget=budget(owner=user_owner))
+    client_owner = authenticate_client(APIClient(), user_owner)
+
+    with caplog.at_level("INFO", logger="family_budget.metrics"):
+        response = client_owner.get(reverse("incomes-list"))
+    assert response.status_code == status.HTTP_200_OK
+    timings = dict(
+        metric.split(";")[0:2] for metric in response["Server-Timing"].split(", ")
+    )
+    assert timings.keys() == {"db", "serializer", "view", "total"}
+    assert 'desc="3 queries"' in response["Server-Timing"]
+    assert response["X-Query-Budget-Exceeded"] == "3/1"
+    (record,) = caplog.records
+    assert record.levelname == "WARNING"
+    assert (record.path, record.status, record.queries) == ("/incomes/", 200, 3)
+
+    settings.REQUEST_METRICS = False
+    response = authenticate_client(APIClient(), user_owner).get(reverse("incomes-list"))
+    assert "Server-Timing" not in response
+
+
+def test_request_metrics_async_view(settings, user, budget, income):
+    settings.REQUEST_METRICS = True
+    user_owner = user()
+    income(budget=budget(owner=user_owner))
+    client_owner = AsyncClient()
+    client_owner.force_login(user_owner)
+
+    async def get():
+        return await client_owner.get(reverse("async-incomes-list"))
+
+    response = async_to_sync(get)()
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["count"] == 1
+    # The queries run in a thread by the async ORM are counted
+    assert 'desc="0 queries"' not in response["Server-Timing"]
+    assert "total;dur=" in response["Server-Timing"]
+    assert connection.execute_wrappers == []
+
+    async def get_response(request):
+        pass
+
+    # The middleware does not switch async requests to a thread
+    assert iscoroutinefunction(RequestMetricsMiddleware(get_response))
+
+
+def test_budget_with_bounded_nested_transactions(client, user, budget, income, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    incomes = sorted(income(budget=budget_1, _quantity=3), key=lambda obj: obj.pk)
+    expense(budget=budget_1)
+    client_owner = authenticate_client(client, user_owner)
+    url = reverse("budgets-detail", kwargs={"pk": budget_1.pk})
+
+    response = client_owner.get(url, {"nested_limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["id"] for item in response.data["incomes"]] == [
+        incomes[0].pk,
+        incomes[1].pk,
+    ]
+    assert response.data["incomes_count"] == 3
+    assert (response.data["expenses_count"], response.data["expenses_next"]) == (1, None)
+
+    response = client_owner.get(response.data["incomes_next"])
+    assert [item["id"] for item in response.data["results"]] == [incomes[2].pk]
+    assert response.data["next"] is None
+
+    response = client_owner.get(reverse("budgets-list"), {"nested_limit": 1})
+    assert len(response.data["results"][0]["incomes"]) == 1
+    response = client_owner.get(url)
+    assert len(response.data["incomes"]) == 3
+    assert "incomes_count" not in response.data
+    response = client_owner.get(url, {"nested_limit": "0"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # Drifted counts do not break the links
+    budget_2 = budget(owner=user_owner)
+    Budget.objects.filter(pk=budget_2.pk).update(income_count=3)
+    response = client_owner.get(
+        reverse("budgets-detail", kwargs={"pk": budget_2.pk}), {"nested_limit": 1}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["incomes_next"] is None
+
+
+def test_transactions_ledger(client, user, budget, income, expense):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    budget_2 = budget(shared_with=[user_owner])
+    income_1 = income(budget=budget_1, amount=10, date=date(2022, 6, 2))
+    expense_1 = expense(budget=budget_2, amount=3, date=date(2022, 6, 2))
+    expense_2 = expense(budget=budget_1, amount=1, date=date(2022, 6, 1))
+    income_2 = income(budget=budget_1, amount=5, date=date(2022, 6, 3))
+    expense(amount=100, date=date(2022, 6, 2))
+    client_owner = authenticate_client(client, user_owner)
+
+    seen = []
+    url, params = reverse("transactions"), {"page_size": 2}
+    while url:
+        response = client_owner.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        seen.extend(response.data["results"])
+        url, params = response.data["next"], None
+    assert [(item["type"], item["id"]) for item in seen] == [
+        ("expense", expense_2.pk),
+        ("expense", expense_1.pk),
+        ("income", income_1.pk),
+        ("income", income_2.pk),
+    ]
+    assert seen[0] == {
+        "type": "expense",
+        "id": expense_2.pk,
+        "budget": budget_1.pk,
+        "amount": "-1.00",
+        "category": expense_2.category,
+        "date": "2022-06-01",
+    }
+
+    response = client_owner.get(
+        reverse("transactions"), {"budget": budget_1.pk, "date_after": "2022-06-02"}
+    )
+    assert [item["id"] for item in response.data["results"]] == [
+        income_1.pk,
+        income_2.pk,
+    ]
+    response = client_owner.get(reverse("transactions"), {"type": "expense"})
+    assert len(response.data["results"]) == 2
+    response = client_owner.get(reverse("transactions"), {"cursor": "invalid"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_sync_changes(client, user, budget, income, expense):
+    user_owner, user_shared = user(), user()
+    budget_1 = budget(owner=user_owner)
+    income_1 = income(budget=budget_1)
+    income_2 = income(budget=budget_1)
+    client_owner = authenticate_client(client, user_owner)
+
+    response = client_owner.get(reverse("sync"))
+    assert response.status_code == status.HTTP_200_OK
+    assert not response.data["has_more"]
+    changes = {(c["type"], c["id"]): c for c in response.data["changes"]}
+    assert set(changes) == {
+        ("budget", budget_1.pk),
+        ("income", income_1.pk),
+        ("income", income_2.pk),
+    }
+    assert changes[("income", income_1.pk)]["action"] == "upsert"
+    assert changes[("income", income_1.pk)]["data"]["amount"] == str(income_1.amount)
+    since = response.data["since"]
+
+    response = client_owner.get(reverse("sync"), {"since": since})
+    assert response.data["changes"] == []
+    assert response.data["since"] == since
+
+    income_1.amount = 99
+    income_1.save()
+    income_2_id = income_2.pk
+    income_2.delete()
+    expense_1 = expense(budget=budget_1)
+    Expense.objects.filter(pk=expense_1.pk).delete()
+    budget_1.shared_with.add(user_shared)
+    response = client_owner.get(reverse("sync"), {"since": since})
+    assert [(c["type"], c["id"], c["action"]) for c in response.data["changes"]] == [
+        ("income", income_1.pk, "upsert"),
+        ("income", income_2_id, "delete"),
+        ("expense", expense_1.pk, "delete"),
+        ("budget", budget_1.pk, "upsert"),
+    ]
+    assert response.data["changes"][0]["data"]["amount"] == "99.00"
+
+    # The shared user gets the budget, its incomes and the refresh of its incomes and expenses
+    client_shared = authenticate_client(APIClient(), user_shared)
+    response = client_shared.get(reverse("sync"))
+    changes = [(c["type"], c["id"], c["action"]) for c in response.data["changes"]]
+    assert ("income", income_1.pk, "upsert") in changes
+    assert ("income", None, "refresh") in changes
+    since_shared = response.data["since"]
+
+    budget_1.shared_with.remove(user_shared)
+    response = client_shared.get(reverse("sync"), {"since": since_shared})
+    assert [(c["type"], c["id"], c["action"]) for c in response.data["changes"]] == [
+        ("budget", budget_1.pk, "delete"),
+    ]
+
+    for since in ("not a token", "1e999", "-1", str(2**63), "٣"):
+        response = client_owner.get(reverse("sync"), {"since": since})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_sync_changes_committed_late(client, user, budget, income):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    client_owner = authenticate_client(client, user_owner)
+    since = client_owner.get(reverse("sync")).data["since"]
+
+    # A change logged first by a transaction committing after one logged later is numbered
+    # after it, so a client which synced in between still gets it
+    income_1 = income(budget=budget_1)
+    late = BudgetChange.objects.get(type="income", object_id=income_1.pk)
+    late_pk = late.pk
+    late.delete()
+    income_2 = income(budget=budget_1)
+    response = client_owner.get(reverse("sync"), {"since": since})
+    assert [c["id"] for c in response.data["changes"]] == [income_2.pk]
+    since = response.data["since"]
+
+    late.pk = late_pk
+    late.save(force_insert=True)
+    assert late.pk < BudgetChange.objects.get(object_id=income_2.pk).pk
+    response = client_owner.get(reverse("sync"), {"since": since})
+    assert [c["id"] for c in response.data["changes"]] == [income_1.pk]
+    assert int(response.data["since"]) > int(since)
+
+
+def test_compact_budget_changes_command(client, user, budget, income):
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    budget_2 = budget(owner=user_owner)
+    income_1 = income(budget=budget_1)
+    income_2 = income(budget=budget_1)
+    client_owner = authenticate_client(client, user_owner)
+    since = client_owner.get(reverse("sync")).data["since"]
+
+    for amount in (1, 2, 3):
+        income_1.amount = amount
+        income_1.save()
+    income_2_id, budget_2_id = income_2.pk, budget_2.pk
+    income_2.delete()
+    budget_2.delete()
+    stdout = StringIO()
+    call_command("compact_budget_changes", "--chunk-size", "1", stdout=stdout)
+    assert "Deleted" in stdout.getvalue()
+    assert BudgetChange.objects.filter(
+        budget_id=budget_1.pk, type="income", object_id=income_1.pk
+    ).count() == 1
+
+    response = client_owner.get(reverse("sync"), {"since": since})
+    assert [(c["type"], c["id"], c["action"]) for c in response.data["changes"]] == [
+        ("income", income_1.pk, "upsert"),
+        ("income", income_2_id, "delete"),
+        ("budget", budget_2_id, "delete"),
+    ]
+    assert response.data["changes"][0]["data"]["amount"] == "3.00"
+
+    # Without a token, deleted incomes and expenses are left out
+    response = client_owner.get(reverse("sync"))
+    changes = [(c["type"], c["id"], c["action"]) for c in response.data["changes"]]
+    assert ("income", income_2_id, "delete") not in changes
+    assert ("income", income_1.pk, "upsert") in changes
+
+
+def test_sync_changes_batches(client, user, budget, income, settings):
+    settings.SYNC_BATCH_SIZE = 2
+    user_owner = user()
+    budget_1 = budget(owner=user_owner)
+    Income.objects.bulk_create(Income(budget=budget_1, amount=1) for _ in range(3))
+    income(budget=budget_1)
+    client_owner = authenticate_client(client, user_owner)
+
+    seen, params = [], {}
+    while True:
+        response = client_owner.get(reverse("sync"), params)
+        seen.extend(response.data["changes"])
+        params = {"since": response.data["since"]}
+        if not response.data["has_more"]:
+            break
+    # The token is the number of the last change synced, whatever the number of budgets
+    assert len(seen) == 5
+    assert [c["version"] for c in seen] == [1, 2, 2, 2, 3]
+    assert params["since"] == str(BudgetChange.objects.aggregate(Max("sequence"))["sequence__max"])
+
+
+def test_conditional_get(client, user, budget, income):
+    user_owner, user_other = user(), user()
+    budget_1 = budget(owner=user_owner)
+    income_1 = income(budget=budget_1)
+    client_owner = authenticate_client(client, user_owner)
+    url = reverse("budgets-detail", args=[budget_1.pk])
+
+    response = client_owner.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    etag = response["ETag"]
+    assert response["Last-Modified"]
+    response = client_owner.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == etag
+    # The ETag depends on the query, which changes the representation
+    response = client_owner.get(url, {"nested_limit": 1}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+    income_url = reverse("incomes-detail", args=[income_1.pk])
+    income_etag = client_owner.get(income_url)["ETag"]
+    list_etag = client_owner.get(reverse("incomes-list"))["ETag"]
+    response = client_owner.get(reverse("incomes-list"), HTTP_IF_NONE_MATCH=list_etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    income(budget=budget_1)
+    response = client_owner.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["incomes"]) == 2
+    assert client_owner.get(income_url, HTTP_IF_NONE_MATCH=income_etag).status_code == (
+        status.HTTP_200_OK
+    )
+    response = client_owner.get(reverse("incomes-list"), HTTP_IF_NONE_MATCH=list_etag)
+    assert response.status_code == status.HTTP_200_OK
+
+    # Access is checked before the conditions
+    client_other = authenticate_client(APIClient(), user_other)
+    response = client_other.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_fast_json_renderer_and_parser():
+    data = {
+        "amount": Decimal("10.50"),
+        "category": CategoryChoices.FOOD.label,
+        "date": date(2022, 6, 1),
+        "created": datetime(2022, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        "times": [datetime(2022, 6, 1, 12, 30), datetime(2022, 6, 1).time()],
+        1: ["caf\u00e9 \u2028", None, 2**70],
+        "page": [{"id": 1, "amount": "1.00"}],
+    }
+    rendered = FastJSONRenderer().render(data)
+    assert rendered == JSONRenderer().render(data)
+    del data[1]
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    parsed = FastJSONParser().parse(BytesIO(rendered))
+    assert parsed["created"] == "2022-06-01T12:30:15.123456Z"
+    assert parsed["1"][0] == "caf\u00e9 \u2028"
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(BytesIO(b"{"))
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r"budgets", views.BudgetAPIViewSet, basename="budgets")
@@ -10,5 +10,38 @@ router.register(r"expenses", views.ExpenseAPIViewSet, basename="expenses")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("summary/", views.SummaryAPIView.as_view(), name="summary"),
+    path("transactions/", views.TransactionsAPIView.as_view(), name="transactions"),
+    path("sync/", views.SyncAPIView.as_view(), name="sync"),
     path("register/", views.UserCreateAPIView.as_view(), name="register"),
+    path(
+        "async/budgets/",
+        async_views.AsyncBudgetListAPIView.as_view(),
+        name="async-budgets-list",
+    ),
+    path(
+        "async/budgets/<int:pk>/",
+        async_views.AsyncBudgetRetrieveAPIView.as_view(),
+        name="async-budgets-detail",
+    ),
+    path(
+        "async/incomes/",
+        async_views.AsyncIncomeListAPIView.as_view(),
+        name="async-incomes-list",
+    ),
+    path(
+        "async/incomes/<int:pk>/",
+        async_views.AsyncIncomeRetrieveAPIView.as_view(),
+        name="async-incomes-detail",
+    ),
+    path(
+        "async/expenses/",
+        async_views.AsyncExpenseListAPIView.as_view(),
+        name="async-expenses-list",
+    ),
+    path(
+        "async/expenses/<int:pk>/",
+        async_views.AsyncExpenseRetrieveAPIView.as_view(),
+        name="async-expenses-detail",
+    ),
 ]
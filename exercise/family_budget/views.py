@@ -1,59 +1,460 @@
+import hashlib
+import io
+from decimal import Decimal
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Count, DateField, Prefetch, Sum, prefetch_related_objects
+from django.db.models.functions import Coalesce, Trunc
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
+from .access import get_budget_access
+from .cache import budget_cache
+from .changes import changes_since, decode_since, encode_since
+from .choices import ChangeActionChoices, ChangeTypeChoices
+from .exports import budget_transaction_rows, csv_stream, ndjson_stream
+from .filters import BudgetPeriodTotalFilter, ExpenseFilter, IncomeFilter
+from .imports import ImportReport, import_transactions
+from .metrics import get_request_metrics
 from .models import Budget, Expense, Income
+from .pagination import LedgerCursorPagination, PkCursorPagination
 from .permissions import IsBudgetOwnerOrSharedWith, IsIncomeExpenseOwnerOrSharedWith
+from .renderers import CSVRenderer, NDJSONRenderer
 from .serializers import (
+    BoundedBudgetSerializer,
     BudgetCreateSerializer,
+    BudgetPeriodTotalSerializer,
     BudgetSerializer,
+    BudgetChangeSerializer,
+    BulkDeleteSerializer,
+    ExpenseBulkCreateSerializer,
+    ExpenseBulkUpdateSerializer,
     ExpenseCreateSerializer,
     ExpenseSerializer,
+    IncomeBulkCreateSerializer,
+    IncomeBulkUpdateSerializer,
     IncomeCreateSerializer,
     IncomeSerializer,
+    RollupSerializer,
     ShareBudgetSerializer,
+    SummarySerializer,
+    SyncBudgetSerializer,
+    TotalsSerializer,
+    TransactionSerializer,
     UserCreateSerializer,
 )
+from .summaries import transactions_summary
+
+
+class MetricsMixin:
+    """
+    Mixin class adding the time spent in the view and in the serializers returned by
+    `get_serializer` to the request metrics, when they are enabled (see `RequestMetricsMiddleware`)
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        metrics = get_request_metrics(request)
+        if metrics is None:
+            return super().dispatch(request, *args, **kwargs)
+        with metrics.timer("view"):
+            return super().dispatch(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        metrics = get_request_metrics(self.request)
+        if metrics is not None:
+            serializer.to_representation = metrics.timed(
+                "serializer", serializer.to_representation
+            )
+        return serializer
+
+
+class ConditionalGetMixin:
+    """
+    Mixin class adding strong `ETag`s to listed and retrieved entries, and `Last-Modified` to
+    retrieved ones, derived from the versions of the budgets they depend on (see
+    `Budget.version`). Requests with a matching `If-None-Match`, or `If-Modified-Since`, get a
+    304 response before anything is serialized.
+    Retrieved entries are serialized by `get_object_data`.
+    """
+
+    def get_object_budget(self, obj):
+        raise NotImplementedError
+
+    def get_object_data(self, obj):
+        return self.get_serializer(obj).data
+
+    def get_etag(self, versions):
+        """
+        Strong `ETag` of the representation of the budget `versions` for the request, which also
+        depends on the URL (host and query) and on the rendered format
+        """
+        digest = hashlib.sha1(
+            f"{self.request.build_absolute_uri()}|"
+            f"{self.request.accepted_media_type}|{versions}".encode()
+        ).hexdigest()
+        return f'"{digest}"'
+
+    def conditional_response(self, etag, last_modified=None):
+        """
+        Return a 304 response if the request conditions match, else None
+        """
+        return get_conditional_response(
+            self.request._request,
+            etag=etag,
+            last_modified=last_modified and int(last_modified.timestamp()),
+        )
+
+    def list(self, request, *args, **kwargs):
+        # The list can only change with the versions of the budgets that the user has access to,
+        # their ids cover lost and new shares
+        versions = list(
+            Budget.objects.accessible_to(request.user)
+            .order_by("pk")
+            .values_list("pk", "version")
+        )
+        etag = self.get_etag(versions)
+        response = self.conditional_response(etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        obj = self.get_object()
+        budget = self.get_object_budget(obj)
+        etag = self.get_etag(f"{budget.pk}:{budget.version}")
+        response = self.conditional_response(etag, budget.updated_at)
+        if response is None:
+            response = Response(self.get_object_data(obj))
+        response["ETag"] = etag
+        if budget.updated_at is not None:
+            response["Last-Modified"] = http_date(budget.updated_at.timestamp())
+        return response
 
 
 class ListAllowedMixin:
     """
     Mixin class overriding `list` method so that the queryset is taken based on the allowed entries
-    for the specific user
+    for the specific user. Lists are paginated with the default pagination unless
+    `?pagination=cursor` selects `cursor_pagination_class`.
+    Views declaring `compact_fields` can also be listed in a compact mode, selected with
+    `?compact=1` or `?fields=` (a comma separated subset of `compact_fields`), which reads plain
+    dicts with `values()` instead of serializing model instances.
+    Views declaring `totals_aggregates` add, with `?with_totals=1`, the `totals` of the whole
+    filtered list to the paginated response. With page number pagination they are computed in the
+    query counting the list.
     """
 
+    cursor_pagination_class = PkCursorPagination
+    compact_fields = ()
+    # Compact fields rendered as strings, e.g. decimals which are otherwise rendered as floats
+    compact_string_fields = ()
+    totals_aggregates = None
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, "_paginator")
+            and self.request.query_params.get("pagination") == "cursor"
+        ):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
     def allowed_queryset(self, request):
         raise NotImplemented
 
+    def get_list_data(self, objects):
+        return self.get_serializer(objects, many=True).data
+
+    def get_compact_fields(self, request):
+        """
+        Return the fields of the compact mode requested with `?fields=` or `?compact=1`, or None
+        """
+        if not self.compact_fields:
+            return None
+        fields = request.query_params.get("fields")
+        if fields is None:
+            if request.query_params.get("compact") not in ("1", "true"):
+                return None
+            return self.compact_fields
+
+        fields = [field for field in fields.split(",") if field]
+        if not fields or not set(fields) <= set(self.compact_fields):
+            raise ValidationError(
+                {"fields": [f"Expected some of: {', '.join(self.compact_fields)}."]}
+            )
+        return fields
+
+    def get_compact_data(self, rows, fields):
+        """
+        Shape rows of `values("pk", ...)` into the compact representation
+        """
+        strings = [field for field in fields if field in self.compact_string_fields]
+        data = []
+        for row in rows:
+            item = {field: row[field] for field in fields if field != "id"}
+            for field in strings:
+                item[field] = str(item[field])
+            data.append({"id": row["pk"], **item} if "id" in fields else item)
+        return data
+
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.allowed_queryset(request))
 
+        fields = self.get_compact_fields(request)
+        if fields is not None:
+            # "pk" is always read, cursor pagination takes its position from it
+            queryset = queryset.values("pk", *(field for field in fields if field != "id"))
+
+        with_totals = self.totals_aggregates and request.query_params.get(
+            "with_totals"
+        ) in ("1", "true")
+        if with_totals and self.paginator is not None:
+            self.paginator.aggregates = self.totals_aggregates
+
         page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        objects = queryset if page is None else page
+        if fields is None:
+            data = self.get_list_data(objects)
+        else:
+            data = self.get_compact_data(objects, fields)
+
+        if page is None:
+            return Response(data)
+        response = self.get_paginated_response(data)
+        if with_totals:
+            totals = self.paginator.get_totals(queryset)
+            response.data["totals"] = TotalsSerializer(totals).data
+        return response
 
-        serializer = self.get_serializer(queryset, many=True)
+
+class BulkMixin:
+    """
+    Mixin class adding `bulk/` endpoint creating (POST), updating (PATCH) and deleting (DELETE)
+    lists of incomes or expenses in batched statements within one transaction.
+    Budget access is resolved once per distinct budget. If any item is invalid nothing is written
+    and the response contains the errors of every item, in the order of the payload.
+    """
+
+    bulk_create_serializer_class = None
+    bulk_update_serializer_class = None
+
+    def budget_access_errors(self, request, items):
+        """
+        Per-item errors for the items referencing budgets that the user has no access to
+        """
+        budget_ids = {item["budget_id"] for item in items if "budget_id" in item}
+        allowed = get_budget_access(request).accessible(budget_ids)
+        return [
+            {"budget": [PermissionDenied.default_detail]}
+            if "budget_id" in item and item["budget_id"] not in allowed
+            else {}
+            for item in items
+        ]
+
+    @action(detail=False, methods=["POST"])
+    def bulk(self, request, *args, **kwargs):
+        serializer = self.bulk_create_serializer_class(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        errors = self.budget_access_errors(request, serializer.validated_data)
+        if any(errors):
+            raise ValidationError(errors)
+
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request, *args, **kwargs):
+        serializer = self.bulk_update_serializer_class(
+            data=request.data, many=True, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+
+        ids = [item["id"] for item in items]
+        instances = list(self.get_queryset().filter(pk__in=ids))
+        allowed = get_budget_access(request).accessible(
+            obj.budget_id for obj in instances
+        )
+        instances = [obj for obj in instances if obj.budget_id in allowed]
+        found_ids = {obj.pk for obj in instances}
+
+        errors = self.budget_access_errors(request, items)
+        seen_ids = set()
+        for item, item_errors in zip(items, errors):
+            if item["id"] not in found_ids:
+                item_errors["id"] = ["Not found."]
+            elif item["id"] in seen_ids:
+                item_errors["id"] = ["Duplicated id."]
+            seen_ids.add(item["id"])
+        if any(errors):
+            raise ValidationError(errors)
+
+        serializer.instance = instances
+        with transaction.atomic():
+            serializer.save()
         return Response(serializer.data)
 
+    @bulk.mapping.delete
+    def bulk_destroy(self, request, *args, **kwargs):
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+
+        rows = list(self.get_queryset().filter(pk__in=ids).values_list("pk", "budget"))
+        allowed = get_budget_access(request).accessible(budget for _, budget in rows)
+        found_ids = {pk for pk, budget in rows if budget in allowed}
+        missing = [pk for pk in ids if pk not in found_ids]
+        if missing:
+            raise ValidationError({"ids": {pk: ["Not found."] for pk in missing}})
+
+        with transaction.atomic():
+            self.get_queryset().model.objects.filter(pk__in=found_ids).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RollupMixin:
+    """
+    Mixin class adding `rollup/` endpoint returning the totals of the listed (allowed and
+    filtered) incomes or expenses per `?period=` day, week or month, grouped by the database
+    """
+
+    rollup_periods = ("day", "week", "month")
 
-class BudgetAPIViewSet(ListAllowedMixin, viewsets.ModelViewSet):
+    @action(detail=False, methods=["GET"])
+    def rollup(self, request, *args, **kwargs):
+        period = request.query_params.get("period", "month")
+        if period not in self.rollup_periods:
+            raise ValidationError(
+                {"period": [f"Expected one of: {', '.join(self.rollup_periods)}."]}
+            )
+
+        rows = (
+            self.filter_queryset(self.allowed_queryset(request))
+            .annotate(period=Trunc("date", period, output_field=DateField()))
+            .order_by()
+            .values("period")
+            .annotate(total=Sum("amount"), count=Count("pk"))
+            .order_by("period")
+        )
+        return Response(RollupSerializer(rows, many=True).data)
+
+
+class BudgetAPIViewSet(
+    MetricsMixin, ConditionalGetMixin, ListAllowedMixin, viewsets.ModelViewSet
+):
     queryset = Budget.objects.order_by("pk")
     serializer_class = BudgetSerializer
     permission_classes = [permissions.IsAuthenticated, IsBudgetOwnerOrSharedWith]
+    export_streams = {"csv": csv_stream, "ndjson": ndjson_stream}
 
-    def allowed_queryset(self, request):
-        return self.get_queryset().filter(
-            Q(owner=request.user) | Q(shared_with__in=[request.user])
+    nested_prefetches = [
+        Prefetch("incomes", queryset=Income.objects.order_by("pk")),
+        Prefetch("expenses", queryset=Expense.objects.order_by("pk")),
+    ]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in (
+            "share",
+            "export",
+            "import_transactions",
+            "summary",
+            "monthly",
+        ):
+            return queryset
+        if self.action in ("list", "retrieve"):
+            # Nested incomes and expenses are prefetched only for budgets missing from the cache
+            return queryset.select_related("owner")
+        return queryset.select_related("owner").prefetch_related(
+            *self.nested_prefetches
+        )
+
+    def get_nested_limit(self):
+        """
+        Number of incomes and expenses embedded in listed and retrieved budgets, requested with
+        `?nested_limit=`. None embeds all of them.
+        """
+        value = self.request.query_params.get("nested_limit")
+        if value is None or self.action not in ("list", "retrieve"):
+            return None
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError({"nested_limit": ["A positive integer is required."]})
+        return min(limit, settings.CURSOR_PAGINATION_MAX_PAGE_SIZE)
+
+    def get_nested_prefetches(self):
+        limit = self.get_nested_limit()
+        if limit is None:
+            return self.nested_prefetches
+        return [
+            Prefetch(
+                "incomes",
+                queryset=Income.objects.order_by("pk")[:limit],
+                to_attr="first_incomes",
+            ),
+            Prefetch(
+                "expenses",
+                queryset=Expense.objects.order_by("pk")[:limit],
+                to_attr="first_expenses",
+            ),
+        ]
+
+    def get_cached_data(self, budgets):
+        """
+        Return serialized budgets from the budget cache, serializing and caching the missing ones.
+        Budgets have to be already checked for access.
+        """
+        budgets = list(budgets)
+        keys = budget_cache.keys(
+            budgets,
+            f"{self.request.build_absolute_uri('/')}:{self.get_nested_limit()}",
         )
+        payloads = budget_cache.get_many(keys)
+
+        missing = [budget for budget in budgets if budget.pk not in payloads]
+        if missing:
+            prefetch_related_objects(missing, *self.get_nested_prefetches())
+            data = self.get_serializer(missing, many=True).data
+            fresh = {budget.pk: payload for budget, payload in zip(missing, data)}
+            budget_cache.set_many({keys[pk]: payload for pk, payload in fresh.items()})
+            payloads.update(fresh)
+
+        return [payloads[budget.pk] for budget in budgets]
+
+    def get_list_data(self, objects):
+        return self.get_cached_data(objects)
+
+    def get_object_budget(self, obj):
+        return obj
+
+    def get_object_data(self, obj):
+        return self.get_cached_data([obj])[0]
+
+    def allowed_queryset(self, request):
+        return self.get_queryset().accessible_to(request.user)
 
     def get_serializer_class(self):
         if self.action == "create":
             return BudgetCreateSerializer
+        if self.get_nested_limit() is not None:
+            return BoundedBudgetSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
@@ -68,26 +469,127 @@ class BudgetAPIViewSet(ListAllowedMixin, viewsets.ModelViewSet):
 
         budget = self.get_object()
 
-        if request.user == budget.owner:
+        if budget.owner_id == request.user.pk:
             budget.shared_with.add(user)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         raise PermissionDenied()
 
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="cache-stats",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def cache_stats(self, request, *args, **kwargs):
+        """
+        Hits and misses of the budget cache, to help sizing it
+        """
+        return Response(budget_cache.stats())
 
-class IncomeAPIViewSet(ListAllowedMixin, viewsets.ModelViewSet):
-    queryset = Income.objects.order_by("pk")
+    @action(detail=True, methods=["GET"])
+    def summary(self, request, *args, **kwargs):
+        """
+        Totals, counts, averages, minimum and maximum amounts of the budget incomes and expenses,
+        overall and by category
+        """
+        budget = self.get_object()
+        key = budget_cache.keys([budget], "summary")[budget.pk]
+        data = budget_cache.get_many({budget.pk: key}).get(budget.pk)
+        if data is None:
+            summary = transactions_summary(budget.incomes.all(), budget.expenses.all())
+            data = SummarySerializer(summary).data
+            budget_cache.set_many({key: data})
+        return Response(data)
+
+    @action(detail=True, methods=["GET"])
+    def monthly(self, request, *args, **kwargs):
+        """
+        Monthly totals of the budget incomes and expenses by category, read from the precomputed
+        `BudgetPeriodTotal` rows. Filtered by `?category=` and `?period_after=`/`?period_before=`.
+        """
+        budget = self.get_object()
+        filterset = BudgetPeriodTotalFilter(
+            request.query_params,
+            queryset=budget.period_totals.order_by("period", "category"),
+            request=request,
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return Response(BudgetPeriodTotalSerializer(filterset.qs, many=True).data)
+
+    @action(detail=True, methods=["GET"], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream all the incomes and expenses of the budget as CSV (`?format=csv`, default) or
+        newline delimited JSON (`?format=ndjson`)
+        """
+        budget = self.get_object()
+        export_format = request.accepted_renderer.format
+        chunk_size = settings.EXPORT_CHUNK_SIZE
+
+        rows = budget_transaction_rows(budget, chunk_size)
+        response = StreamingHttpResponse(
+            self.export_streams[export_format](rows, chunk_size),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="budget-{budget.pk}.{export_format}"'
+        )
+        return response
+
+    @action(
+        detail=True,
+        methods=["POST"],
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_transactions(self, request, *args, **kwargs):
+        """
+        Import incomes and expenses of the budget from a CSV `file` with `type`, `amount` and
+        `category` columns. Valid rows are created, rejected rows are reported with their errors.
+        The file is imported in a single transaction, nothing is created when it cannot be read.
+        """
+        budget = self.get_object()
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["No file was submitted."]})
+
+        report = ImportReport(max_reported=settings.IMPORT_MAX_REPORTED_REJECTIONS)
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            # Otherwise the chunks loaded before the error would be kept, and duplicated when the
+            # client retries the failed import
+            with transaction.atomic():
+                import_transactions(budget, lines, settings.IMPORT_CHUNK_SIZE, report)
+        except (DjangoValidationError, UnicodeDecodeError) as error:
+            raise ValidationError({"file": [str(getattr(error, "message", error))]})
+        return Response(report.as_dict())
+
+
+class IncomeAPIViewSet(
+    MetricsMixin,
+    ConditionalGetMixin,
+    ListAllowedMixin,
+    BulkMixin,
+    RollupMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Income.objects.select_related("budget").order_by("pk")
     serializer_class = IncomeSerializer
+    bulk_create_serializer_class = IncomeBulkCreateSerializer
+    bulk_update_serializer_class = IncomeBulkUpdateSerializer
     permission_classes = [permissions.IsAuthenticated, IsIncomeExpenseOwnerOrSharedWith]
-    filterset_fields = ("budget", "category")
+    filterset_class = IncomeFilter
+    compact_fields = ("id", "budget", "amount", "category", "date")
+    compact_string_fields = ("amount",)
+    totals_aggregates = {"total": Coalesce(Sum("amount"), Decimal(0))}
 
     def allowed_queryset(self, request):
-        return self.get_queryset().filter(
-            Q(budget__owner=request.user) | Q(budget__shared_with__in=[request.user])
-        )
+        return self.get_queryset().accessible_to(request.user)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    def get_object_budget(self, obj):
+        return obj.budget
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -95,19 +597,29 @@ class IncomeAPIViewSet(ListAllowedMixin, viewsets.ModelViewSet):
         return self.serializer_class
 
 
-class ExpenseAPIViewSet(ListAllowedMixin, viewsets.ModelViewSet):
-    queryset = Expense.objects.order_by("pk")
+class ExpenseAPIViewSet(
+    MetricsMixin,
+    ConditionalGetMixin,
+    ListAllowedMixin,
+    BulkMixin,
+    RollupMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Expense.objects.select_related("budget").order_by("pk")
     serializer_class = ExpenseSerializer
+    bulk_create_serializer_class = ExpenseBulkCreateSerializer
+    bulk_update_serializer_class = ExpenseBulkUpdateSerializer
     permission_classes = [permissions.IsAuthenticated, IsIncomeExpenseOwnerOrSharedWith]
-    filterset_fields = ("budget", "category")
+    filterset_class = ExpenseFilter
+    compact_fields = ("id", "budget", "amount", "category", "date")
+    compact_string_fields = ("amount",)
+    totals_aggregates = {"total": Coalesce(Sum("amount"), Decimal(0))}
 
     def allowed_queryset(self, request):
-        return self.get_queryset().filter(
-            Q(budget__owner=request.user) | Q(budget__shared_with__in=[request.user])
-        )
+        return self.get_queryset().accessible_to(request.user)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    def get_object_budget(self, obj):
+        return obj.budget
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -115,5 +627,142 @@ class ExpenseAPIViewSet(ListAllowedMixin, viewsets.ModelViewSet):
         return self.serializer_class
 
 
+class SummaryAPIView(MetricsMixin, generics.GenericAPIView):
+    """
+    Totals, counts, averages, minimum and maximum amounts of the incomes and expenses of all the
+    budgets that the user has access to, overall and by category
+    """
+
+    serializer_class = SummarySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        summary = transactions_summary(
+            Income.objects.accessible_to(request.user),
+            Expense.objects.accessible_to(request.user),
+        )
+        return Response(self.get_serializer(summary).data)
+
+
+class TransactionsAPIView(MetricsMixin, generics.GenericAPIView):
+    """
+    Incomes and expenses of all the budgets that the user has access to in a single chronological
+    ledger, with negative amounts for expenses. They are filtered like `/incomes/` and
+    `/expenses/` and by `?type=` income or expense.
+    """
+
+    serializer_class = TransactionSerializer
+    pagination_class = LedgerCursorPagination
+    permission_classes = [permissions.IsAuthenticated]
+    transaction_types = {
+        "income": (Income, IncomeFilter),
+        "expense": (Expense, ExpenseFilter),
+    }
+
+    def get(self, request, *args, **kwargs):
+        types = list(self.transaction_types)
+        kind = request.query_params.get("type")
+        if kind is not None:
+            if kind not in self.transaction_types:
+                raise ValidationError(
+                    {"type": [f"Expected one of: {', '.join(self.transaction_types)}."]}
+                )
+            types = [kind]
+
+        querysets = {}
+        for kind in types:
+            model, filterset_class = self.transaction_types[kind]
+            filterset = filterset_class(
+                request.query_params,
+                queryset=model.objects.accessible_to(request.user),
+                request=request,
+            )
+            if not filterset.is_valid():
+                raise ValidationError(filterset.errors)
+            querysets[kind] = filterset.qs
+
+        page = self.paginator.paginate_ledger(querysets, request)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
+class SyncAPIView(MetricsMixin, generics.GenericAPIView):
+    """
+    Feed of the changes of the budgets that the user has access to, and of their incomes and
+    expenses, since the `?since=` token returned by the previous call, or since the beginning
+    without it. Upserted objects come with their current representation, `refresh` changes ask
+    to fetch all the incomes or expenses of a budget again.
+    """
+
+    serializer_class = BudgetChangeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    payload_serializers = {
+        ChangeTypeChoices.BUDGET: (
+            Budget.objects.select_related("owner"),
+            SyncBudgetSerializer,
+        ),
+        ChangeTypeChoices.INCOME: (
+            Income.objects.select_related("budget"),
+            IncomeSerializer,
+        ),
+        ChangeTypeChoices.EXPENSE: (
+            Expense.objects.select_related("budget"),
+            ExpenseSerializer,
+        ),
+    }
+
+    def get(self, request, *args, **kwargs):
+        sequence = None
+        since = request.query_params.get("since")
+        if since:
+            try:
+                sequence = decode_since(since)
+            except ValueError:
+                raise ValidationError({"since": ["Invalid sync token."]})
+
+        changes, has_more, last = changes_since(
+            request.user, sequence, settings.SYNC_BATCH_SIZE
+        )
+
+        # Only the last change of an object matters, its data is the current one anyway
+        latest = {
+            (change.budget_id, change.type, change.object_id): change
+            for change in changes
+        }
+        changes = sorted(latest.values(), key=lambda change: change.sequence)
+        self.add_payloads(changes)
+        return Response(
+            {
+                "since": encode_since(last),
+                "has_more": has_more,
+                "changes": self.get_serializer(changes, many=True).data,
+            }
+        )
+
+    def add_payloads(self, changes):
+        """
+        Set the `data` of the changes, fetching the upserted objects with a query per type.
+        Objects which are gone from the budget of the change since then are reported as deleted,
+        their deletion or move is logged with a later version.
+        """
+        upserted = {}
+        for change in changes:
+            change.data = None
+            if change.action == ChangeActionChoices.UPSERT:
+                upserted.setdefault(change.type, []).append(change)
+
+        for change_type, type_changes in upserted.items():
+            queryset, serializer_class = self.payload_serializers[change_type]
+            objs = queryset.in_bulk([change.object_id for change in type_changes])
+            for change in type_changes:
+                obj = objs.get(change.object_id)
+                budget_id = getattr(obj, "budget_id", change.object_id)
+                if obj is None or budget_id != change.budget_id:
+                    change.action = ChangeActionChoices.DELETE
+                    continue
+                change.data = serializer_class(
+                    obj, context=self.get_serializer_context()
+                ).data
+
+
 class UserCreateAPIView(generics.CreateAPIView):
     serializer_class = UserCreateSerializer